@@ -1663,7 +1663,9 @@ def conv1d(x, kernel, strides=1, padding='valid',
     if padding == 'causal':
         # causal (dilated) convolution:
         left_pad = dilation_rate * (kernel.shape[0] - 1)
-        x = temporal_padding(x, (left_pad, 0))
+        # A kernel of size 1 is already causal: skip the padding copy.
+        if left_pad:
+            x = temporal_padding(x, (left_pad, 0))
         padding = 'valid'
 
     if data_format == 'channels_last':
@@ -4,7 +4,6 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
-import scipy.signal as signal
 import scipy as sp
 from .common import floatx
 from keras.utils.generic_utils import transpose_shape
@@ -54,34 +53,56 @@ def normalize_conv(func):
     return wrapper
 
 
+def _conv_patches(x, w, padding):
+    """Sliding windows of the channels-first `x` for the flipped kernel `w`.
+
+    # Returns
+        The kernel flipped back for a cross-correlation, and a strided
+        view of the padded `x` of shape
+        `(batch, channels) + output_size + kernel_size`.
+    """
+    spatial = x.ndim - 2
+    w = w[(py_slice(None), py_slice(None)) +
+          (py_slice(None, None, -1),) * spatial]
+    kernel_size = w.shape[2:]
+    if padding == 'same':
+        pad = [(k // 2, (k - 1) // 2) for k in kernel_size]
+    elif padding == 'full':
+        pad = [(k - 1, k - 1) for k in kernel_size]
+    else:
+        pad = [(0, 0) for _ in kernel_size]
+    x = np.pad(x, [(0, 0), (0, 0)] + pad, 'constant')
+    out_size = tuple(s - k + 1 for s, k in zip(x.shape[2:], kernel_size))
+    patches = np.lib.stride_tricks.as_strided(
+        x,
+        shape=x.shape[:2] + out_size + kernel_size,
+        strides=x.strides + x.strides[2:])
+    return w, patches
+
+
 @normalize_conv
 def conv(x, w, padding, data_format):
-    y = []
-    for i in range(x.shape[0]):
-        _y = []
-        for j in range(w.shape[1]):
-            __y = []
-            for k in range(w.shape[0]):
-                __y.append(signal.convolve(x[i, k], w[k, j], mode=padding))
-            _y.append(np.sum(np.stack(__y, axis=-1), axis=-1))
-        y.append(_y)
-    y = np.array(y)
-    return y
+    # `w` was flipped by `normalize_conv` for `signal.convolve`; flip it back
+    # and compute the cross-correlation as a single im2col product.
+    spatial = x.ndim - 2
+    w, patches = _conv_patches(x, w, padding)
+    window_axes = list(range(2 + spatial, 2 + 2 * spatial))
+    y = np.tensordot(patches, w,
+                     axes=([1] + window_axes, [0] + list(range(2, 2 + spatial))))
+    return np.moveaxis(y, -1, 1)
 
 
 @normalize_conv
 def depthwise_conv(x, w, padding, data_format):
-    y = []
-    for i in range(x.shape[0]):
-        _y = []
-        for j in range(w.shape[0]):
-            __y = []
-            for k in range(w.shape[1]):
-                __y.append(signal.convolve(x[i, j], w[j, k], mode=padding))
-            _y.append(np.stack(__y, axis=0))
-        y.append(np.concatenate(_y, axis=0))
-    y = np.array(y)
-    return y
+    # Every channel is correlated with its own kernels in one product over
+    # the flattened windows; output channel `c * depth_multiplier + m`.
+    spatial = x.ndim - 2
+    w, patches = _conv_patches(x, w, padding)
+    out_size = patches.shape[2:2 + spatial]
+    patches = patches.reshape(patches.shape[:2 + spatial] + (-1,))
+    y = np.einsum('nc...k,cmk->ncm...', patches,
+                  w.reshape(w.shape[:2] + (-1,)))
+    return y.reshape((x.shape[0], -1) + out_size)
 
 
 def separable_conv(x, w1, w2, padding, data_format):
@@ -713,6 +734,12 @@ def resize_volumes(x, depth_factor, height_factor, width_factor, data_format):
     return x
 
 
+def count_sketch(h, s, x, d=16000):
+    y = np.zeros((x.shape[0], d), dtype=x.dtype)
+    np.add.at(y.T, h, (x * s).T)
+    return y
+
+
 def one_hot(indices, num_classes):
     return to_categorical(indices, num_classes)
 
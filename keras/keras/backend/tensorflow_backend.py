@@ -170,6 +170,10 @@ def get_session():
     Note that you can manually set the global session
     via `K.set_session(sess)`.
 
+    When the `OMP_NUM_THREADS` environment variable is set, it bounds the
+    threads used inside each op, and by default the number of ops run
+    concurrently as well. `KERAS_INTER_OP_THREADS` overrides the latter.
+
     # Returns
         A TensorFlow session.
     """
@@ -185,8 +189,14 @@ def get_session():
                 config = tf.ConfigProto(allow_soft_placement=True)
             else:
                 num_thread = int(os.environ.get('OMP_NUM_THREADS'))
+                # Ops running in parallel each use up to `num_thread`
+                # threads, which can oversubscribe the cores (e.g. several
+                # convolutions at once). `KERAS_INTER_OP_THREADS=1` runs
+                # one op at a time, each op using all the threads.
+                inter_op_threads = int(os.environ.get('KERAS_INTER_OP_THREADS',
+                                                      num_thread))
                 config = tf.ConfigProto(intra_op_parallelism_threads=num_thread,
-                                        inter_op_parallelism_threads=num_thread,
+                                        inter_op_parallelism_threads=inter_op_threads,
                                         allow_soft_placement=True)
 
             config.gpu_options.allow_growth = True  # dynamically grow the memory used on the GPU
@@ -4175,7 +4185,9 @@ def conv1d(x, kernel, strides=1, padding='valid',
                              '(temporal data).')
         # causal (dilated) convolution:
         left_pad = dilation_rate * (kernel_shape[0] - 1)
-        x = temporal_padding(x, (left_pad, 0))
+        # A kernel of size 1 is already causal: skip the padding copy.
+        if left_pad:
+            x = temporal_padding(x, (left_pad, 0))
         padding = 'valid'
     padding = _preprocess_padding(padding)
     x, tf_data_format = _preprocess_conv1d_input(x, data_format)
@@ -4638,7 +4650,15 @@ def bias_add(x, bias, data_format=None):
         raise ValueError('Unexpected bias dimensions %d, '
                          'expect to be 1 or %d dimensions'
                          % (len(bias_shape), ndim(x)))
-    if ndim(x) == 5:
+    if len(bias_shape) == 1 and data_format == 'channels_last':
+        # A plain `BiasAdd` node (instead of a broadcast `Add`) lets the
+        # graph optimizer fuse it with the preceding convolution/matmul
+        # and the following activation.
+        x = tf.nn.bias_add(x, bias)
+    elif ndim(x) == 5 and len(bias_shape) == 1 and _has_nchw_support():
+        # `channels_first` here: `NCHW` also covers `NCDHW` inputs.
+        x = tf.nn.bias_add(x, bias, data_format='NCHW')
+    elif ndim(x) == 5:
         if len(bias_shape) == 1:
             new_shape = (1, 1, 1, 1, bias_shape[0])
         else:
@@ -4797,23 +4817,11 @@ def count_sketch(h, s, x, d=16000):
         x: Count sketch input vector
         d: Compact Bilinear dimension
     """
-    print('count_sketch is not implemented in the tensorflow backend')
-    pass
-
-
-def __count_sketch(h, s, v,  # Sequences
-                   y,  # Outputs info
-                   ):
-    """Count sketch utility.
-    See https://arxiv.org/abs/1606.01847.
-
-    # Arguments
-        h: Count sketch vector h \in \{1, d\} ^n
-        s: Count sketch vector s \in \{-1, 1\} ^n
-        v: Count sketch input vector
-        y: Projected output vector
-    """
-    pass
+    # Component `j` of every input vector is added, times `s[j]`, to
+    # component `h[j]` of its sketch: a single segment sum over the
+    # transposed inputs.
+    x = x * tf.cast(s, x.dtype)
+    return tf.transpose(tf.unsorted_segment_sum(tf.transpose(x), h, d))
 
 
 # 1d Convolution
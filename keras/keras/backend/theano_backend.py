@@ -3436,7 +3436,9 @@ def conv1d(x, kernel, strides=1, padding='valid',
         if not kernel_shape:
             raise AttributeError('Causal padding requires kernel._keras_shape set.')
         left_pad = dilation_rate * (kernel_shape[0] - 1)
-        x = temporal_padding(x, (left_pad, 0))
+        # A kernel of size 1 is already causal: skip the padding copy.
+        if left_pad:
+            x = temporal_padding(x, (left_pad, 0))
         padding = 'valid'
     shape = int_shape(x)
     if data_format == 'channels_last':
@@ -4171,26 +4173,11 @@ def count_sketch(h, s, x, d=16000):
         x: Count sketch input vector
         d: Compact Bilinear dimension
     """
-    rval, updates = theano.scan(fn=__count_sketch,
-                                sequences=[h, s, x.dimshuffle(1, 0)],
-                                outputs_info=T.alloc(0., x.shape[0], d),
-                                non_sequences=[], n_steps=x.shape[1])
-    return rval[-1]  # We are interested only in the last value
-
-
-def __count_sketch(h, s, v,  # Sequences
-                   y,  # Outputs info
-                   ):
-    """Count sketch utility.
-    See https://arxiv.org/abs/1606.01847.
-
-    # Arguments
-        h: Count sketch vector h \in \{1, d\} ^n
-        s: Count sketch vector s \in \{-1, 1\} ^n
-        v: Count sketch input vector
-        y: Projected output vector
-    """
-    return T.cast(T.inc_subtensor(y[:, h], T.dot(s, v)), 'float32')
+    # Component `j` of every input vector is added, times `s[j]`, to
+    # component `h[j]` of its sketch: one scatter-add over the transposed
+    # inputs, which accumulates the repeated indices of `h`.
+    y = T.zeros((d, x.shape[0]), dtype=x.dtype)
+    return T.inc_subtensor(y[h], (x * T.cast(s, x.dtype)).T).T
 
 
 # 1d Convolution
@@ -5,6 +5,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
+
 from .. import backend as K
 from .. import activations
 from .. import initializers
@@ -29,41 +31,56 @@ from ..legacy.layers import AtrousConvolution2D
 
 
 class ClassActivationMapping(Layer):
-    # TODO: Test this layer
     """Class Activation Mapping computation used in GAP networks.
 
     # Arguments
         weights_shape: Set of weights shapes
         weights: Set of weights (numpy.array) already learned that connect a
             GAP (global average pooling) layer with a Dense layer.
+        data_format: A string,
+            one of `"channels_first"` (default) or `"channels_last"`.
+            The ordering of the dimensions in the inputs.
+            With `"channels_last"` the class maps are computed without
+            transposing the feature maps.
 
     # Input shape
-        Arbitrary. Use the keyword argument `input_shape`
-        (tuple of integers, does not include the samples axis)
-        when using this layer as the first layer in a model.
+        4D tensor with shape:
+        `(batch, channels, rows, cols)`
+        if `data_format` is `"channels_first"`
+        or 4D tensor with shape:
+        `(batch, rows, cols, channels)`
+        if `data_format` is `"channels_last"`.
 
     # Output shape
-        Same shape as input.
+        4D tensor with shape:
+        `(batch, n_classes, rows, cols)`
+        if `data_format` is `"channels_first"`
+        or 4D tensor with shape:
+        `(batch, rows, cols, n_classes)`
+        if `data_format` is `"channels_last"`.
 
     # References
         - [Learning Deep Features for Discriminative Localization](https://arxiv.org/abs/1512.04150)
     """
 
-    def __init__(self, weights_shape, weights=None, **kwargs):
-        self.weights_shape = weights_shape
-        self.initial_weights = [weights]
-        self.init = initializations.get('uniform', dim_ordering='th')
-        self.input_spec = [InputSpec(ndim=4)]
+    def __init__(self, weights_shape, weights=None,
+                 data_format='channels_first', **kwargs):
         super(ClassActivationMapping, self).__init__(**kwargs)
+        self.weights_shape = tuple(weights_shape)
+        self.data_format = K.normalize_data_format(data_format)
+        self.initial_weights = [weights]
+        self.init = initializers.get('uniform')
+        self.input_spec = InputSpec(ndim=4)
 
     def build(self, input_shape):
-        self.W = self.init(self.weights_shape,
-                           name='{}_W'.format(self.name))
-        self.trainable_weights = [self.W]
+        self.W = self.add_weight(shape=self.weights_shape,
+                                 initializer=self.init,
+                                 name='W')
 
         # initialize weights
-        if (self.initial_weights[0] is not None):
+        if self.initial_weights[0] is not None:
             self.set_weights(self.initial_weights)
+        self.built = True
 
     def call(self, x, mask=None):
         '''
@@ -78,18 +95,336 @@ class ClassActivationMapping(Layer):
             activation at pixel (x,y) produced by the deep convolution layers
             applied before the GAP layer.
         '''
+        if self.data_format == 'channels_last':
+            return K.dot(x, self.W)  # (batch_size, x, y, n_classes)
         x = K.permute_dimensions(x, (0, 2, 3, 1))
         x = K.dot(x, self.W)
         x = K.permute_dimensions(x, (0, 3, 1, 2))  # (batch_size, n_classes, x, y)
         return x
 
-    def get_output_shape_for(self, input_shape):
-        return tuple([input_shape[0]] + [self.weights_shape[1]] + list(input_shape[2:]))
+    def compute_output_shape(self, input_shape):
+        if self.data_format == 'channels_last':
+            return tuple(input_shape[:-1]) + (self.weights_shape[1],)
+        return (input_shape[0], self.weights_shape[1]) + tuple(input_shape[2:])
 
     def get_config(self):
-        config = {'weights_shape': self.weights_shape}
+        config = {'weights_shape': self.weights_shape,
+                  'data_format': self.data_format}
         base_config = super(ClassActivationMapping, self).get_config()
-        return dict(list(base_config.items()) + list(config.items()))
+        return dict(base_config, **config)
+
+
+def _normalize_tuple(value, n, name):
+    """Fast path for `conv_utils.normalize_tuple`.
+
+    Ints and tuples of `n` ints, the usual arguments, are returned
+    directly; anything else goes through the full validation.
+    """
+    if isinstance(value, int):
+        return (value,) * n
+    if (isinstance(value, tuple) and len(value) == n and
+            all(isinstance(v, int) for v in value)):
+        return value
+    return conv_utils.normalize_tuple(value, n, name)
+
+
+def _pad_inputs_2d(inputs, kernel_size, strides, padding):
+    """Pads channels-last `inputs` as the backends do for `"same"` padding.
+
+    # Returns
+        The padded inputs, and the number of output rows and columns.
+    """
+    rows, cols = K.int_shape(inputs)[1:3]
+    out_rows = conv_utils.conv_output_length(rows, kernel_size[0], padding,
+                                             strides[0])
+    out_cols = conv_utils.conv_output_length(cols, kernel_size[1], padding,
+                                             strides[1])
+    if padding == 'same':
+        pad_h = max((out_rows - 1) * strides[0] + kernel_size[0] - rows, 0)
+        pad_w = max((out_cols - 1) * strides[1] + kernel_size[1] - cols, 0)
+        inputs = K.spatial_2d_padding(inputs,
+                                      padding=((pad_h // 2, pad_h - pad_h // 2),
+                                               (pad_w // 2, pad_w - pad_w // 2)),
+                                      data_format='channels_last')
+    return inputs, out_rows, out_cols
+
+
+def _direct_conv2d(inputs, kernel, strides=(1, 1), padding='valid',
+                   data_format=None):
+    """2D convolution computed directly, without any lowering.
+
+    The output is accumulated over the kernel taps and input channels,
+    each term being a strided slice of one input channel scaled by the
+    matching kernel row. This avoids building an im2col matrix whose
+    inner dimension, `kernel_rows * kernel_cols * input_dim`, is too
+    small for an efficient matrix product when there are only a few
+    input channels (e.g. the RGB input of a first layer).
+
+    # Arguments
+        inputs: 4D input tensor. Its spatial dimensions must be static.
+        kernel: kernel tensor of shape
+            `(kernel_rows, kernel_cols, input_dim, filters)`.
+        strides: tuple of 2 integers.
+        padding: string, `"same"` or `"valid"`.
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    # Returns
+        A tensor, result of the 2D convolution.
+    """
+    if data_format == 'channels_first':
+        inputs = K.permute_dimensions(inputs, (0, 2, 3, 1))
+    kernel_h, kernel_w, input_dim, _ = K.int_shape(kernel)
+    stride_h, stride_w = strides
+    inputs, out_rows, out_cols = _pad_inputs_2d(inputs, (kernel_h, kernel_w),
+                                                strides, padding)
+    end_h = (out_rows - 1) * stride_h + 1
+    end_w = (out_cols - 1) * stride_w + 1
+    outputs = None
+    for i in range(kernel_h):
+        for j in range(kernel_w):
+            for c in range(input_dim):
+                term = (inputs[:, i:i + end_h:stride_h, j:j + end_w:stride_w,
+                               c:c + 1] *
+                        kernel[i, j, c])
+                outputs = term if outputs is None else outputs + term
+
+    if data_format == 'channels_first':
+        outputs = K.permute_dimensions(outputs, (0, 3, 1, 2))
+    return outputs
+
+
+def _direct_depthwise_conv2d(inputs, kernel, strides=(1, 1), padding='valid',
+                             data_format=None):
+    """Depthwise 2D convolution computed directly.
+
+    The output is accumulated over the kernel taps, each term being a
+    strided slice of the inputs scaled channel-wise by the matching kernel
+    row, like a pooling window with weights. The slices are read straight
+    from the inputs, so no patch matrix is built, and unlike a grouped
+    convolution no cross-channel (zero) weights are ever multiplied.
+
+    # Arguments
+        inputs: 4D input tensor. Its spatial dimensions must be static.
+        kernel: kernel tensor of shape
+            `(kernel_rows, kernel_cols, input_dim, depth_multiplier)`.
+        strides: tuple of 2 integers.
+        padding: string, `"same"` or `"valid"`.
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    # Returns
+        A tensor, result of the depthwise convolution.
+    """
+    if data_format == 'channels_first':
+        inputs = K.permute_dimensions(inputs, (0, 2, 3, 1))
+    kernel_h, kernel_w, input_dim, depth_multiplier = K.int_shape(kernel)
+    stride_h, stride_w = strides
+    inputs, out_rows, out_cols = _pad_inputs_2d(inputs, (kernel_h, kernel_w),
+                                                strides, padding)
+    if depth_multiplier == 1:
+        kernel = kernel[:, :, :, 0]
+    else:
+        inputs = K.expand_dims(inputs)
+    end_h = (out_rows - 1) * stride_h + 1
+    end_w = (out_cols - 1) * stride_w + 1
+    outputs = None
+    for i in range(kernel_h):
+        for j in range(kernel_w):
+            term = (inputs[:, i:i + end_h:stride_h, j:j + end_w:stride_w] *
+                    kernel[i, j])
+            outputs = term if outputs is None else outputs + term
+    if depth_multiplier != 1:
+        # Output channel `c * depth_multiplier + m`, as the backends do.
+        outputs = K.reshape(outputs, (-1, out_rows, out_cols,
+                                      input_dim * depth_multiplier))
+
+    if data_format == 'channels_first':
+        outputs = K.permute_dimensions(outputs, (0, 3, 1, 2))
+    return outputs
+
+
+def _mec_conv2d(inputs, kernel, strides=(1, 1), padding='valid',
+                data_format=None):
+    """2D convolution computed with the MEC lowering.
+
+    Instead of materializing the full im2col matrix, only the width axis
+    is expanded, into a lowered tensor of shape
+    `(batch, out_cols, rows * kernel_cols * channels)`. Every output row is
+    then obtained with a single matrix product between a slice of the
+    lowered tensor and the flattened kernel, so the lowered tensor is
+    about `kernel_rows` times smaller than the im2col one.
+
+    # Arguments
+        inputs: 4D input tensor. Its spatial dimensions must be static.
+        kernel: kernel tensor of shape
+            `(kernel_rows, kernel_cols, input_dim, filters)`.
+        strides: tuple of 2 integers.
+        padding: string, `"same"` or `"valid"`.
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    # Returns
+        A tensor, result of the 2D convolution.
+
+    # References
+        - [MEC: Memory-efficient Convolution for Deep Neural Network](
+           https://arxiv.org/abs/1706.06873)
+    """
+    if data_format == 'channels_first':
+        inputs = K.permute_dimensions(inputs, (0, 2, 3, 1))
+    kernel_h, kernel_w, input_dim, filters = K.int_shape(kernel)
+    stride_h, stride_w = strides
+    inputs, out_rows, out_cols = _pad_inputs_2d(inputs, (kernel_h, kernel_w),
+                                                strides, padding)
+    rows = K.int_shape(inputs)[1]
+
+    # Lowered tensor: one flattened (rows, kernel_w, input_dim) strip
+    # per output column.
+    strip = rows * kernel_w * input_dim
+    lowered = K.concatenate(
+        [K.reshape(inputs[:, :, j * stride_w:j * stride_w + kernel_w, :],
+                   (-1, 1, strip))
+         for j in range(out_cols)], axis=1)
+
+    patch = kernel_h * kernel_w * input_dim
+    row_offset = stride_h * kernel_w * input_dim
+    flat_kernel = K.reshape(kernel, (patch, filters))
+    outputs = K.stack(
+        [K.dot(lowered[:, :, i * row_offset:i * row_offset + patch],
+               flat_kernel)
+         for i in range(out_rows)], axis=1)
+
+    if data_format == 'channels_first':
+        outputs = K.permute_dimensions(outputs, (0, 3, 1, 2))
+    return outputs
+
+
+# Transforms of the Winograd minimal filtering algorithm F(2x2, 3x3).
+_WINOGRAD_BT = ((1, 0, -1, 0), (0, 1, 1, 0), (0, -1, 1, 0), (0, 1, 0, -1))
+_WINOGRAD_G = ((1, 0, 0), (.5, .5, .5), (.5, -.5, .5), (0, 0, 1))
+_WINOGRAD_AT = ((1, 1, 1, 0), (0, 1, -1, -1))
+
+
+def _linear_combination(coefficients, terms):
+    """Sums `terms` weighted by `coefficients`, skipping zero coefficients."""
+    result = None
+    for coefficient, term in zip(coefficients, terms):
+        if coefficient == 0:
+            continue
+        if coefficient != 1:
+            term = coefficient * term
+        result = term if result is None else result + term
+    return result
+
+
+def _winograd_transform(matrix, tiles):
+    """Computes `matrix . tiles . matrix^T` on a nested list of tensors."""
+    left = [[_linear_combination(coefficients, [row[j] for row in tiles])
+             for j in range(len(tiles[0]))]
+            for coefficients in matrix]
+    return [[_linear_combination(coefficients, row)
+             for coefficients in matrix]
+            for row in left]
+
+
+def _winograd_conv2d(inputs, kernel, strides=(1, 1), padding='valid',
+                     data_format=None):
+    """3x3, stride 1 2D convolution computed with Winograd F(2x2, 3x3).
+
+    The inputs are split into overlapping 4x4 tiles (with stride 2), each
+    producing a 2x2 output tile. In the Winograd domain the convolution
+    becomes 16 independent matrix products between the transformed input
+    tiles and the transformed kernel, which takes 2.25 times fewer
+    multiplications than the direct convolution.
+
+    # Arguments
+        inputs: 4D input tensor. Its spatial dimensions must be static.
+        kernel: kernel tensor of shape `(3, 3, input_dim, filters)`.
+        strides: tuple of 2 integers, must be `(1, 1)`.
+        padding: string, `"same"` or `"valid"`.
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    # Returns
+        A tensor, result of the 2D convolution.
+
+    # References
+        - [Fast Algorithms for Convolutional Neural Networks](
+           https://arxiv.org/abs/1509.09308)
+    """
+    if data_format == 'channels_first':
+        inputs = K.permute_dimensions(inputs, (0, 2, 3, 1))
+    filters = K.int_shape(kernel)[-1]
+    rows, cols = K.int_shape(inputs)[1:3]
+    pad = 1 if padding == 'same' else 0
+    out_rows = rows + 2 * pad - 2
+    out_cols = cols + 2 * pad - 2
+    tile_rows = (out_rows + 1) // 2
+    tile_cols = (out_cols + 1) // 2
+    # Pad so that the tiles cover the (possibly odd) output entirely.
+    inputs = K.spatial_2d_padding(
+        inputs,
+        padding=((pad, pad + 2 * tile_rows - out_rows),
+                 (pad, pad + 2 * tile_cols - out_cols)),
+        data_format='channels_last')
+
+    # d[i][j] holds element (i, j) of every input tile.
+    d = [[inputs[:, i:i + 2 * tile_rows:2, j:j + 2 * tile_cols:2, :]
+          for j in range(4)]
+         for i in range(4)]
+    v = _winograd_transform(_WINOGRAD_BT, d)
+    g = [[kernel[i, j] for j in range(3)] for i in range(3)]
+    u = _winograd_transform(_WINOGRAD_G, g)
+    m = [[K.dot(v[i][j], u[i][j]) for j in range(4)] for i in range(4)]
+    y = _winograd_transform(_WINOGRAD_AT, m)
+
+    # Interleave the 2x2 output tiles back into the output grid.
+    outputs = K.stack([K.stack(y[0], axis=3), K.stack(y[1], axis=3)], axis=2)
+    outputs = K.reshape(outputs, (-1, 2 * tile_rows, 2 * tile_cols, filters))
+    outputs = outputs[:, :out_rows, :out_cols, :]
+
+    if data_format == 'channels_first':
+        outputs = K.permute_dimensions(outputs, (0, 3, 1, 2))
+    return outputs
+
+
+# Above this many input channels, the backend convolution is faster than
+# the direct one.
+_DIRECT_MAX_INPUT_DIM = 4
+
+_LOWERINGS = {'mec': _mec_conv2d,
+              'winograd': _winograd_conv2d,
+              'direct': _direct_conv2d}
+
+
+def _static_or_dynamic_shape(x, axes):
+    """Lengths of `x` along `axes`: static when known, else scalar tensors.
+
+    Only the unknown lengths (usually just the batch size) are sliced out
+    of `K.shape(x)`, so that no shape op is added for the others.
+    """
+    static_shape = K.int_shape(x)
+    if all(static_shape[axis] is not None for axis in axes):
+        return [static_shape[axis] for axis in axes]
+    dynamic_shape = K.shape(x)
+    return [dynamic_shape[axis] if static_shape[axis] is None
+            else static_shape[axis]
+            for axis in axes]
+
+
+def _deconv_output_lengths(space, deconv_args, padding):
+    """Output lengths of a transposed convolution along each spatial axis.
+
+    # Arguments
+        space: list of input lengths, integers or scalar tensors.
+        deconv_args: tuple of `(stride, kernel_size, output_padding,
+            dilation)` tuples, one per spatial axis.
+        padding: string, `"same"` or `"valid"`.
+
+    # Returns
+        A list of output lengths, integers wherever the input length is.
+    """
+    return [conv_utils.deconv_length(length, stride, kernel_size, padding,
+                                     output_padding, dilation)
+            for length, (stride, kernel_size, output_padding, dilation)
+            in zip(space, deconv_args)]
 
 
 class _Conv(Layer):
@@ -147,6 +482,27 @@ class _Conv(Layer):
             (see [constraints](../constraints.md)).
         bias_constraint: Constraint function applied to the bias vector
             (see [constraints](../constraints.md)).
+        lowering: `None`, `"mec"`, `"winograd"` or `"direct"`. With `"mec"`, 2D
+            convolutions without dilation and with static spatial
+            dimensions are computed with the memory-efficient MEC lowering
+            instead of the backend convolution. `"winograd"` does the same
+            with the Winograd F(2x2, 3x3) algorithm, for 3x3 kernels with
+            stride 1 only, and `"direct"` with a direct convolution, for
+            at most 4 input channels only (e.g. an RGB first layer).
+            Other cases fall back to the backend.
+        compute_dtype: `None`, `"float16"` or `"bfloat16"`. If set, the
+            inputs and the weights are cast to this dtype for the
+            convolution and the bias add, and the result is cast back to
+            the input dtype before the activation is applied. Weights are
+            kept in their original dtype.
+        separable: Boolean. If True (1D and 2D only), the kernel is
+            factorized into a depthwise kernel followed by a pointwise
+            (1x1) kernel, and the layer computes a separable convolution.
+            For large kernels and many channels this takes far fewer
+            multiplications, at the cost of a less expressive kernel.
+            The kernel initializer, regularizer and constraint apply
+            to both kernels, which are stored as `depthwise_kernel` and
+            `pointwise_kernel`; such a layer has no `kernel` attribute.
     """
 
     def __init__(self, rank,
@@ -165,17 +521,19 @@ class _Conv(Layer):
                  activity_regularizer=None,
                  kernel_constraint=None,
                  bias_constraint=None,
+                 lowering=None,
+                 compute_dtype=None,
+                 separable=False,
                  **kwargs):
         super(_Conv, self).__init__(**kwargs)
         self.rank = rank
         self.filters = filters
-        self.kernel_size = conv_utils.normalize_tuple(kernel_size, rank,
-                                                      'kernel_size')
-        self.strides = conv_utils.normalize_tuple(strides, rank, 'strides')
+        self.kernel_size = _normalize_tuple(kernel_size, rank, 'kernel_size')
+        self.strides = _normalize_tuple(strides, rank, 'strides')
         self.padding = conv_utils.normalize_padding(padding)
         self.data_format = K.normalize_data_format(data_format)
-        self.dilation_rate = conv_utils.normalize_tuple(dilation_rate, rank,
-                                                        'dilation_rate')
+        self.dilation_rate = _normalize_tuple(dilation_rate, rank,
+                                              'dilation_rate')
         self.activation = activations.get(activation)
         self.use_bias = use_bias
         self.kernel_initializer = initializers.get(kernel_initializer)
@@ -185,7 +543,52 @@ class _Conv(Layer):
         self.activity_regularizer = regularizers.get(activity_regularizer)
         self.kernel_constraint = constraints.get(kernel_constraint)
         self.bias_constraint = constraints.get(bias_constraint)
+        if lowering is not None and lowering not in _LOWERINGS:
+            raise ValueError('The `lowering` argument must be one of None, '
+                             '"mec", "winograd" or "direct". '
+                             'Received: ' + str(lowering))
+        self.lowering = lowering
+        if compute_dtype not in {None, 'float16', 'bfloat16'}:
+            raise ValueError('The `compute_dtype` argument must be one of '
+                             'None, "float16" or "bfloat16". '
+                             'Received: ' + str(compute_dtype))
+        self.compute_dtype = compute_dtype
+        if separable and rank not in {1, 2}:
+            raise ValueError('`separable` is only supported for 1D and 2D '
+                             'convolutions.')
+        if separable and lowering is not None:
+            raise ValueError('`separable` cannot be combined with '
+                             '`lowering`.')
+        if lowering is not None and rank != 2:
+            raise ValueError('`lowering` is only supported for 2D '
+                             'convolutions.')
+        self.separable = separable
         self.input_spec = InputSpec(ndim=self.rank + 2)
+        # Resolve the backend convolution and its arguments once,
+        # so that `call` does not dispatch on `rank` at every step.
+        # No per-shape cache is kept on top of this: the backends build a
+        # static graph, so each call site is already specialized on the
+        # static shape of its inputs when the graph is compiled. Likewise,
+        # no output workspace is kept: the backend allocators already reuse
+        # buffers across steps, and writing into a variable would add a copy.
+        if separable:
+            self._conv_fn = {1: K.separable_conv1d,
+                             2: K.separable_conv2d}[rank]
+        else:
+            self._conv_fn = {1: K.conv1d, 2: K.conv2d, 3: K.conv3d}[rank]
+        # For rank 1, the scalar strides and dilation rate expected by the
+        # backends are extracted here once rather than at every call.
+        self._conv_kwargs = {
+            'strides': self.strides[0] if rank == 1 else self.strides,
+            'padding': self.padding,
+            'data_format': self.data_format,
+            'dilation_rate': (self.dilation_rate[0] if rank == 1
+                              else self.dilation_rate)}
+        # Effective (dilated) kernel extent and strides as arrays, used to
+        # compute output shapes for all spatial axes at once.
+        self._kernel_extent = ((np.asarray(self.kernel_size) - 1) *
+                               np.asarray(self.dilation_rate) + 1)
+        self._strides_array = np.asarray(self.strides)
 
     def build(self, input_shape):
         if self.data_format == 'channels_first':
@@ -196,13 +599,33 @@ class _Conv(Layer):
             raise ValueError('The channel dimension of the inputs '
                              'should be defined. Found `None`.')
         input_dim = input_shape[channel_axis]
-        kernel_shape = self.kernel_size + (input_dim, self.filters)
-
-        self.kernel = self.add_weight(shape=kernel_shape,
-                                      initializer=self.kernel_initializer,
-                                      name='kernel',
-                                      regularizer=self.kernel_regularizer,
-                                      constraint=self.kernel_constraint)
+        # The kernel is stored channels-last (spatial dims, then input and
+        # output channels) whatever `data_format` is. This is the layout
+        # TensorFlow consumes natively, so no per-call kernel transpose
+        # happens there; only the inputs may be transposed by the backend.
+        # Theano and CNTK reorder it in the graph (a dimshuffle view on
+        # Theano); a second, pre-transposed copy would instead have to be
+        # re-synced with an assign after every update.
+        if self.separable:
+            self.depthwise_kernel = self.add_weight(
+                shape=self.kernel_size + (input_dim, 1),
+                initializer=self.kernel_initializer,
+                name='depthwise_kernel',
+                regularizer=self.kernel_regularizer,
+                constraint=self.kernel_constraint)
+            self.pointwise_kernel = self.add_weight(
+                shape=(1,) * self.rank + (input_dim, self.filters),
+                initializer=self.kernel_initializer,
+                name='pointwise_kernel',
+                regularizer=self.kernel_regularizer,
+                constraint=self.kernel_constraint)
+        else:
+            kernel_shape = self.kernel_size + (input_dim, self.filters)
+            self.kernel = self.add_weight(shape=kernel_shape,
+                                          initializer=self.kernel_initializer,
+                                          name='kernel',
+                                          regularizer=self.kernel_regularizer,
+                                          constraint=self.kernel_constraint)
         if self.use_bias:
             self.bias = self.add_weight(shape=(self.filters,),
                                         initializer=self.bias_initializer,
@@ -217,46 +640,76 @@ class _Conv(Layer):
         self.built = True
 
     def call(self, inputs):
-        if self.rank == 1:
-            outputs = K.conv1d(
-                inputs,
-                self.kernel,
-                strides=self.strides[0],
-                padding=self.padding,
-                data_format=self.data_format,
-                dilation_rate=self.dilation_rate[0])
-        if self.rank == 2:
-            outputs = K.conv2d(
+        if self.compute_dtype is not None:
+            dtype = K.dtype(inputs)
+            inputs = K.cast(inputs, self.compute_dtype)
+
+        if self.separable:
+            outputs = self._conv_fn(
                 inputs,
-                self.kernel,
-                strides=self.strides,
-                padding=self.padding,
-                data_format=self.data_format,
-                dilation_rate=self.dilation_rate)
-        if self.rank == 3:
-            outputs = K.conv3d(
+                self._compute_weight(self.depthwise_kernel),
+                self._compute_weight(self.pointwise_kernel),
+                **self._conv_kwargs)
+        elif self.rank == 2 and self._supports_lowering(inputs):
+            outputs = _LOWERINGS[self.lowering](
                 inputs,
-                self.kernel,
+                self._compute_weight(self.kernel),
                 strides=self.strides,
                 padding=self.padding,
-                data_format=self.data_format,
-                dilation_rate=self.dilation_rate)
+                data_format=self.data_format)
+        else:
+            outputs = self._conv_fn(inputs,
+                                    self._compute_weight(self.kernel),
+                                    **self._conv_kwargs)
 
         if self.use_bias:
             outputs = K.bias_add(
                 outputs,
-                self.bias,
+                self._compute_weight(self.bias),
                 data_format=self.data_format)
 
+        if self.compute_dtype is not None:
+            outputs = K.cast(outputs, dtype)
+
         if self.activation is not None:
             return self.activation(outputs)
         return outputs
 
-    def compute_output_shape(self, input_shape):
-        if self.data_format == 'channels_last':
-            space = input_shape[1:-1]
-        elif self.data_format == 'channels_first':
-            space = input_shape[2:]
+    def _compute_weight(self, weight):
+        """Casts `weight` to `compute_dtype`, if set."""
+        if self.compute_dtype is None:
+            return weight
+        return K.cast(weight, self.compute_dtype)
+
+    def _supports_lowering(self, inputs):
+        """Whether `self.lowering` can be used for these inputs."""
+        if (self.lowering is None or
+                self.dilation_rate != (1, 1) or
+                self.padding not in {'valid', 'same'}):
+            return False
+        if self.lowering == 'winograd' and (self.kernel_size != (3, 3) or
+                                            self.strides != (1, 1)):
+            return False
+        if self.data_format == 'channels_first':
+            input_dim = K.int_shape(inputs)[1]
+            space = K.int_shape(inputs)[2:]
+        else:
+            input_dim = K.int_shape(inputs)[-1]
+            space = K.int_shape(inputs)[1:-1]
+        if self.lowering == 'direct' and input_dim > _DIRECT_MAX_INPUT_DIM:
+            return False
+        return None not in space
+
+    def _output_space(self, space):
+        """Output lengths of the convolution along the spatial axes."""
+        if None not in space and self.padding in {'valid', 'same'}:
+            space = np.asarray(space)
+            if self.padding == 'valid':
+                new_space = ((space - self._kernel_extent) //
+                             self._strides_array + 1)
+            else:
+                new_space = -(-space // self._strides_array)
+            return [int(dim) for dim in new_space]
         new_space = []
         for i in range(len(space)):
             new_dim = conv_utils.conv_output_length(
@@ -266,6 +719,14 @@ class _Conv(Layer):
                 stride=self.strides[i],
                 dilation=self.dilation_rate[i])
             new_space.append(new_dim)
+        return new_space
+
+    def compute_output_shape(self, input_shape):
+        if self.data_format == 'channels_last':
+            space = input_shape[1:-1]
+        elif self.data_format == 'channels_first':
+            space = input_shape[2:]
+        new_space = self._output_space(space)
         if self.data_format == 'channels_last':
             return (input_shape[0],) + tuple(new_space) + (self.filters,)
         elif self.data_format == 'channels_first':
@@ -289,10 +750,13 @@ class _Conv(Layer):
             'activity_regularizer':
                 regularizers.serialize(self.activity_regularizer),
             'kernel_constraint': constraints.serialize(self.kernel_constraint),
-            'bias_constraint': constraints.serialize(self.bias_constraint)
+            'bias_constraint': constraints.serialize(self.bias_constraint),
+            'lowering': self.lowering,
+            'compute_dtype': self.compute_dtype,
+            'separable': self.separable
         }
         base_config = super(_Conv, self).get_config()
-        return dict(list(base_config.items()) + list(config.items()))
+        return dict(base_config, **config)
 
     def set_lr_multipliers(self, W_learning_rate_multiplier, b_learning_rate_multiplier):
         self.W_learning_rate_multiplier = W_learning_rate_multiplier
@@ -498,6 +962,13 @@ class Conv2D(_Conv):
             (see [constraints](../constraints.md)).
         bias_constraint: Constraint function applied to the bias vector
             (see [constraints](../constraints.md)).
+        lowering: `None`, `"mec"`, `"winograd"` or `"direct"`. If `"mec"`, the
+            convolution is computed with the memory-efficient MEC lowering
+            whenever `dilation_rate` is 1 and the spatial dimensions of the
+            inputs are known. `"winograd"` uses the Winograd F(2x2, 3x3)
+            algorithm under the same conditions, for 3x3 kernels with
+            stride 1 only, and `"direct"` a direct convolution, for at
+            most 4 input channels only.
 
     # Input shape
         4D tensor with shape:
@@ -533,6 +1004,7 @@ class Conv2D(_Conv):
                  activity_regularizer=None,
                  kernel_constraint=None,
                  bias_constraint=None,
+                 lowering=None,
                  **kwargs):
         super(Conv2D, self).__init__(
             rank=2,
@@ -551,6 +1023,7 @@ class Conv2D(_Conv):
             activity_regularizer=activity_regularizer,
             kernel_constraint=kernel_constraint,
             bias_constraint=bias_constraint,
+            lowering=lowering,
             **kwargs)
 
     def get_config(self):
@@ -558,6 +1031,74 @@ class Conv2D(_Conv):
         config.pop('rank')
         return config
 
+    @staticmethod
+    def fuse_siblings(layers, inputs):
+        """Applies several sibling `Conv2D` layers to the same inputs at once.
+
+        The kernels (and biases) of the layers are concatenated along the
+        filters axis so that a single convolution is run, and its output is
+        split back into one tensor per layer. Each layer's activation is then
+        applied to its own slice.
+
+        This operates on backend tensors (e.g. inside the `call` of a custom
+        layer): the outputs are not Keras tensors and the layers'
+        activity regularizers are not applied.
+
+        # Arguments
+            layers: List of built `Conv2D` layers sharing `kernel_size`,
+                `strides`, `padding`, `data_format` and `dilation_rate`.
+            inputs: Input tensor shared by all the layers.
+
+        # Returns
+            List of output tensors, one per layer, in the same order.
+
+        # Raises
+            ValueError: if the layers cannot be fused.
+        """
+        if not layers:
+            raise ValueError('`fuse_siblings` expects at least one layer.')
+        first = layers[0]
+        for layer in layers:
+            if (type(layer) is not Conv2D or not layer.built or
+                    layer.separable):
+                raise ValueError('`fuse_siblings` only fuses built, non '
+                                 'separable `Conv2D` layers. '
+                                 'Received: ' + str(layer))
+            if layer.lowering is not None or layer.compute_dtype is not None:
+                raise ValueError('`fuse_siblings` does not support layers '
+                                 'with `lowering` or `compute_dtype` set. '
+                                 'Received: ' + str(layer))
+            if (layer.kernel_size != first.kernel_size or
+                    layer.data_format != first.data_format or
+                    layer._conv_kwargs != first._conv_kwargs):
+                raise ValueError('Layers `' + first.name + '` and `' +
+                                 layer.name + '` do not share the same '
+                                 'convolution arguments and cannot be fused.')
+
+        kernel = K.concatenate([layer.kernel for layer in layers], axis=-1)
+        outputs = K.conv2d(inputs, kernel, **first._conv_kwargs)
+        fused_bias = all(layer.use_bias for layer in layers)
+        if fused_bias:
+            bias = K.concatenate([layer.bias for layer in layers], axis=-1)
+            outputs = K.bias_add(outputs, bias, data_format=first.data_format)
+
+        results = []
+        start = 0
+        for layer in layers:
+            end = start + layer.filters
+            if first.data_format == 'channels_first':
+                output = outputs[:, start:end]
+            else:
+                output = outputs[..., start:end]
+            start = end
+            if layer.use_bias and not fused_bias:
+                output = K.bias_add(output, layer.bias,
+                                    data_format=layer.data_format)
+            if layer.activation is not None:
+                output = layer.activation(output)
+            results.append(output)
+        return results
+
     def set_lr_multipliers(self, W_learning_rate_multiplier, b_learning_rate_multiplier):
         self.W_learning_rate_multiplier = W_learning_rate_multiplier
         self.b_learning_rate_multiplier = b_learning_rate_multiplier
@@ -770,6 +1311,10 @@ class Conv2DTranspose(Conv2D):
             (see [constraints](../constraints.md)).
         bias_constraint: Constraint function applied to the bias vector
             (see [constraints](../constraints.md)).
+        lowering: `None`, `"mec"`, `"winograd"` or `"direct"`. With
+            `strides` 1, the transposed convolution is computed as a forward
+            convolution, which then uses this lowering as described in
+            `Conv2D` (e.g. `"winograd"` for 3x3 kernels).
 
     # Input shape
         4D tensor with shape:
@@ -838,16 +1383,30 @@ class Conv2DTranspose(Conv2D):
             kernel_constraint=kernel_constraint,
             bias_constraint=bias_constraint,
             **kwargs)
+        if self.separable:
+            raise ValueError('`Conv2DTranspose` does not support '
+                             '`separable`.')
 
         self.output_padding = output_padding
         if self.output_padding is not None:
             self.output_padding = conv_utils.normalize_tuple(
                 self.output_padding, 2, 'output_padding')
-            for stride, out_pad in zip(self.strides, self.output_padding):
-                if out_pad >= stride:
-                    raise ValueError('Stride ' + str(self.strides) + ' must be '
-                                     'greater than output padding ' +
-                                     str(self.output_padding))
+            if any(out_pad >= stride for stride, out_pad
+                   in zip(self.strides, self.output_padding)):
+                raise ValueError('Stride ' + str(self.strides) + ' must be '
+                                 'greater than output padding ' +
+                                 str(self.output_padding))
+        # Per-axis arguments of `conv_utils.deconv_length`, resolved once.
+        self._deconv_args = tuple(zip(self.strides,
+                                      self.kernel_size,
+                                      self.output_padding or (None, None),
+                                      self.dilation_rate))
+        # `_conv_stride_one` reproduces the output lengths of the
+        # transposed convolution only without `output_padding`, and for
+        # the paddings of the forward convolutions it computes.
+        self._is_stride_one = (self.strides == (1, 1) and
+                               self.output_padding is None and
+                               self.padding in ('valid', 'same'))
 
     def build(self, input_shape):
         if len(input_shape) != 4:
@@ -862,6 +1421,9 @@ class Conv2DTranspose(Conv2D):
             raise ValueError('The channel dimension of the inputs '
                              'should be defined. Found `None`.')
         input_dim = input_shape[channel_axis]
+        # `(spatial dims, filters, input_dim)` is the filter layout of
+        # TensorFlow's transposed convolution (the one of the forward
+        # convolution it is the gradient of), so it is passed as is.
         kernel_shape = self.kernel_size + (self.filters, input_dim)
 
         self.kernel = self.add_weight(shape=kernel_shape,
@@ -882,55 +1444,97 @@ class Conv2DTranspose(Conv2D):
         self.built = True
 
     def call(self, inputs):
-        input_shape = K.shape(inputs)
-        batch_size = input_shape[0]
+        if self.compute_dtype is not None:
+            dtype = K.dtype(inputs)
+            inputs = K.cast(inputs, self.compute_dtype)
+
+        if self._is_stride_one:
+            outputs = self._conv_stride_one(inputs)
+        else:
+            outputs = self._conv_transpose(inputs)
+
+        if self.use_bias:
+            outputs = K.bias_add(
+                outputs,
+                self._compute_weight(self.bias),
+                data_format=self.data_format)
+
+        if self.compute_dtype is not None:
+            outputs = K.cast(outputs, dtype)
+
+        if self.activation is not None:
+            return self.activation(outputs)
+        return outputs
+
+    def _conv_transpose(self, inputs):
+        """Computes the transposed convolution with the backend op.
+
+        On CPU, TensorFlow already implements it as a single GEMM of the
+        inputs with the flattened kernel followed by a col2im scatter.
+        """
         if self.data_format == 'channels_first':
             h_axis, w_axis = 2, 3
         else:
             h_axis, w_axis = 1, 2
+        batch_size, height, width = _static_or_dynamic_shape(
+            inputs, (0, h_axis, w_axis))
 
-        height, width = input_shape[h_axis], input_shape[w_axis]
-        kernel_h, kernel_w = self.kernel_size
-        stride_h, stride_w = self.strides
-        if self.output_padding is None:
-            out_pad_h = out_pad_w = None
-        else:
-            out_pad_h, out_pad_w = self.output_padding
-
-        # Infer the dynamic output shape:
-        out_height = conv_utils.deconv_length(height,
-                                              stride_h, kernel_h,
-                                              self.padding,
-                                              out_pad_h,
-                                              self.dilation_rate[0])
-        out_width = conv_utils.deconv_length(width,
-                                             stride_w, kernel_w,
-                                             self.padding,
-                                             out_pad_w,
-                                             self.dilation_rate[1])
+        # Infer the output shape, static wherever the input shape is:
+        out_height, out_width = _deconv_output_lengths(
+            (height, width), self._deconv_args, self.padding)
         if self.data_format == 'channels_first':
             output_shape = (batch_size, self.filters, out_height, out_width)
         else:
             output_shape = (batch_size, out_height, out_width, self.filters)
 
-        outputs = K.conv2d_transpose(
+        return K.conv2d_transpose(
             inputs,
-            self.kernel,
+            self._compute_weight(self.kernel),
             output_shape,
             self.strides,
             padding=self.padding,
             data_format=self.data_format,
             dilation_rate=self.dilation_rate)
 
-        if self.use_bias:
-            outputs = K.bias_add(
-                outputs,
-                self.bias,
-                data_format=self.data_format)
-
-        if self.activation is not None:
-            return self.activation(outputs)
-        return outputs
+    def _conv_stride_one(self, inputs):
+        """Computes a stride 1 transposed convolution as a forward one.
+
+        With stride 1, the transposed convolution is the forward
+        convolution of the inputs, padded on both sides, with the spatially
+        flipped kernel whose channel axes are swapped. The forward
+        convolution is the op backends optimize best, e.g. TensorFlow can
+        fuse it with the following bias add and activation.
+        """
+        kernel = K.permute_dimensions(
+            K.reverse(self._compute_weight(self.kernel), axes=(0, 1)),
+            (0, 1, 3, 2))
+        extent = [(k - 1) * d + 1
+                  for k, d in zip(self.kernel_size, self.dilation_rate)]
+        if self.padding == 'same' and all(e % 2 for e in extent):
+            padding = 'same'
+        else:
+            # The forward convolution pads (e - 1) // 2 before and the rest
+            # after, so its transpose pads the other way around.
+            if self.padding == 'same':
+                pads = tuple((e - 1 - (e - 1) // 2, (e - 1) // 2)
+                             for e in extent)
+            else:
+                pads = tuple((e - 1, e - 1) for e in extent)
+            inputs = K.spatial_2d_padding(inputs, padding=pads,
+                                          data_format=self.data_format)
+            padding = 'valid'
+        if self._supports_lowering(inputs):
+            return _LOWERINGS[self.lowering](inputs,
+                                             kernel,
+                                             strides=(1, 1),
+                                             padding=padding,
+                                             data_format=self.data_format)
+        return K.conv2d(inputs,
+                        kernel,
+                        strides=(1, 1),
+                        padding=padding,
+                        data_format=self.data_format,
+                        dilation_rate=self.dilation_rate)
 
     def compute_output_shape(self, input_shape):
         output_shape = list(input_shape)
@@ -939,26 +1543,11 @@ class Conv2DTranspose(Conv2D):
         else:
             c_axis, h_axis, w_axis = 3, 1, 2
 
-        kernel_h, kernel_w = self.kernel_size
-        stride_h, stride_w = self.strides
-        if self.output_padding is None:
-            out_pad_h = out_pad_w = None
-        else:
-            out_pad_h, out_pad_w = self.output_padding
-
         output_shape[c_axis] = self.filters
-        output_shape[h_axis] = conv_utils.deconv_length(output_shape[h_axis],
-                                                        stride_h,
-                                                        kernel_h,
-                                                        self.padding,
-                                                        out_pad_h,
-                                                        self.dilation_rate[0])
-        output_shape[w_axis] = conv_utils.deconv_length(output_shape[w_axis],
-                                                        stride_w,
-                                                        kernel_w,
-                                                        self.padding,
-                                                        out_pad_w,
-                                                        self.dilation_rate[1])
+        output_shape[h_axis], output_shape[w_axis] = _deconv_output_lengths(
+            (input_shape[h_axis], input_shape[w_axis]),
+            self._deconv_args,
+            self.padding)
         return tuple(output_shape)
 
     def get_config(self):
@@ -1121,11 +1710,16 @@ class Conv3DTranspose(Conv3D):
         if self.output_padding is not None:
             self.output_padding = conv_utils.normalize_tuple(
                 self.output_padding, 3, 'output_padding')
-            for stride, out_pad in zip(self.strides, self.output_padding):
-                if out_pad >= stride:
-                    raise ValueError('Stride ' + str(self.strides) + ' must be '
-                                     'greater than output padding ' +
-                                     str(self.output_padding))
+            if any(out_pad >= stride for stride, out_pad
+                   in zip(self.strides, self.output_padding)):
+                raise ValueError('Stride ' + str(self.strides) + ' must be '
+                                 'greater than output padding ' +
+                                 str(self.output_padding))
+        # Per-axis arguments of `conv_utils.deconv_length`, resolved once.
+        self._deconv_args = tuple(zip(self.strides,
+                                      self.kernel_size,
+                                      self.output_padding or (None,) * 3,
+                                      (1,) * 3))
 
     def build(self, input_shape):
         if len(input_shape) != 5:
@@ -1140,6 +1734,9 @@ class Conv3DTranspose(Conv3D):
             raise ValueError('The channel dimension of the inputs '
                              'should be defined. Found `None`.')
         input_dim = input_shape[channel_axis]
+        # `(spatial dims, filters, input_dim)` is the filter layout of
+        # TensorFlow's transposed convolution (the one of the forward
+        # convolution it is the gradient of), so it is passed as is.
         kernel_shape = self.kernel_size + (self.filters, input_dim)
 
         self.kernel = self.add_weight(shape=kernel_shape,
@@ -1160,37 +1757,20 @@ class Conv3DTranspose(Conv3D):
         self.built = True
 
     def call(self, inputs):
-        input_shape = K.shape(inputs)
-        batch_size = input_shape[0]
+        if self.compute_dtype is not None:
+            dtype = K.dtype(inputs)
+            inputs = K.cast(inputs, self.compute_dtype)
+
         if self.data_format == 'channels_first':
             d_axis, h_axis, w_axis = 2, 3, 4
         else:
             d_axis, h_axis, w_axis = 1, 2, 3
+        batch_size, depth, height, width = _static_or_dynamic_shape(
+            inputs, (0, d_axis, h_axis, w_axis))
 
-        depth = input_shape[d_axis]
-        height = input_shape[h_axis]
-        width = input_shape[w_axis]
-
-        kernel_d, kernel_h, kernel_w = self.kernel_size
-        stride_d, stride_h, stride_w = self.strides
-        if self.output_padding is None:
-            out_pad_d = out_pad_h = out_pad_w = None
-        else:
-            out_pad_d, out_pad_h, out_pad_w = self.output_padding
-
-        # Infer the dynamic output shape:
-        out_depth = conv_utils.deconv_length(depth,
-                                             stride_d, kernel_d,
-                                             self.padding,
-                                             out_pad_d)
-        out_height = conv_utils.deconv_length(height,
-                                              stride_h, kernel_h,
-                                              self.padding,
-                                              out_pad_h)
-        out_width = conv_utils.deconv_length(width,
-                                             stride_w, kernel_w,
-                                             self.padding,
-                                             out_pad_w)
+        # Infer the output shape, static wherever the input shape is:
+        out_depth, out_height, out_width = _deconv_output_lengths(
+            (depth, height, width), self._deconv_args, self.padding)
 
         if self.data_format == 'channels_first':
             output_shape = (batch_size, self.filters,
@@ -1200,7 +1780,7 @@ class Conv3DTranspose(Conv3D):
                             out_height, out_width, self.filters)
 
         outputs = K.conv3d_transpose(inputs,
-                                     self.kernel,
+                                     self._compute_weight(self.kernel),
                                      output_shape,
                                      self.strides,
                                      padding=self.padding,
@@ -1209,9 +1789,12 @@ class Conv3DTranspose(Conv3D):
         if self.use_bias:
             outputs = K.bias_add(
                 outputs,
-                self.bias,
+                self._compute_weight(self.bias),
                 data_format=self.data_format)
 
+        if self.compute_dtype is not None:
+            outputs = K.cast(outputs, dtype)
+
         if self.activation is not None:
             return self.activation(outputs)
         return outputs
@@ -1223,30 +1806,13 @@ class Conv3DTranspose(Conv3D):
         else:
             c_axis, d_axis, h_axis, w_axis = 4, 1, 2, 3
 
-        kernel_d, kernel_h, kernel_w = self.kernel_size
-        stride_d, stride_h, stride_w = self.strides
-        if self.output_padding is None:
-            out_pad_d = out_pad_h = out_pad_w = None
-        else:
-            out_pad_d, out_pad_h, out_pad_w = self.output_padding
-
         output_shape[c_axis] = self.filters
-        output_shape[d_axis] = conv_utils.deconv_length(output_shape[d_axis],
-                                                        stride_d,
-                                                        kernel_d,
-                                                        self.padding,
-                                                        out_pad_d)
-        output_shape[h_axis] = conv_utils.deconv_length(output_shape[h_axis],
-                                                        stride_h,
-                                                        kernel_h,
-                                                        self.padding,
-                                                        out_pad_h)
-        output_shape[w_axis] = conv_utils.deconv_length(output_shape[w_axis],
-                                                        stride_w,
-                                                        kernel_w,
-                                                        self.padding,
-                                                        out_pad_w)
-
+        (output_shape[d_axis],
+         output_shape[h_axis],
+         output_shape[w_axis]) = _deconv_output_lengths(
+            (input_shape[d_axis], input_shape[h_axis], input_shape[w_axis]),
+            self._deconv_args,
+            self.padding)
         return tuple(output_shape)
 
     def get_config(self):
@@ -1256,6 +1822,33 @@ class Conv3DTranspose(Conv3D):
         return config
 
 
+def _needs_nhwc_transpose(data_format):
+    """Whether depthwise convolutions should run on channels-last inputs.
+
+    TensorFlow has no channels-first depthwise kernels on CPU, so each
+    backend op transposes its channels-first inputs and outputs. Layers
+    for which this returns `True` transpose once around their whole
+    `call` instead.
+
+    # Arguments
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    # Returns
+        A boolean.
+    """
+    if data_format != 'channels_first' or K.backend() != 'tensorflow':
+        return False
+    from ..backend import tensorflow_backend
+    return not tensorflow_backend._has_nchw_support()
+
+
+# Separable convolutions are computed in blocks of at most this many
+# output rows, each block's depthwise patches (as an im2col matrix would
+# hold them, per sample) fitting in about this many bytes.
+_SEPARABLE_TILE_ROWS = 32
+_SEPARABLE_TILE_BYTES = 4 * 1024 * 1024
+
+
 class _SeparableConv(_Conv):
     """Abstract nD depthwise separable convolution layer (private).
 
@@ -1337,6 +1930,14 @@ class _SeparableConv(_Conv):
             (see [constraints](../constraints.md)).
         bias_constraint: Constraint function applied to the bias vector
             (see [constraints](../constraints.md)).
+        row_tiling: Boolean (2D only). If True and the inputs, once
+            channels-last, have static spatial dimensions, the
+            convolution, bias and activation are computed in blocks of
+            output rows that are concatenated at the end, instead of with
+            the backend separable convolution. This bounds the size of
+            the depthwise patches of each block, but the blocks may run
+            concurrently, training keeps the activations of all of them,
+            and the concatenation copies the output once more.
 
     # Input shape
         4D tensor with shape:
@@ -1376,6 +1977,7 @@ class _SeparableConv(_Conv):
                  depthwise_constraint=None,
                  pointwise_constraint=None,
                  bias_constraint=None,
+                 row_tiling=False,
                  **kwargs):
         super(_SeparableConv, self).__init__(
             rank=rank,
@@ -1399,13 +2001,26 @@ class _SeparableConv(_Conv):
         self.pointwise_regularizer = regularizers.get(pointwise_regularizer)
         self.depthwise_constraint = constraints.get(depthwise_constraint)
         self.pointwise_constraint = constraints.get(pointwise_constraint)
+        if (self.lowering is not None or self.compute_dtype is not None or
+                self.separable):
+            raise ValueError('`SeparableConv' + str(rank) + 'D` does not '
+                             'support `lowering`, `compute_dtype` or '
+                             '`separable`.')
+        if row_tiling and rank != 2:
+            raise ValueError('`row_tiling` is only supported for 2D '
+                             'separable convolutions.')
+        self.row_tiling = row_tiling
+        # These layers always run the separable backend convolution.
+        self._conv_fn = {1: K.separable_conv1d,
+                         2: K.separable_conv2d}[rank]
+        self._channel_axis = 1 if self.data_format == 'channels_first' else -1
 
     def build(self, input_shape):
         if len(input_shape) < self.rank + 2:
             raise ValueError('Inputs to `SeparableConv' + str(self.rank) + 'D` '
                              'should have rank ' + str(self.rank + 2) + '. '
                              'Received input shape:', str(input_shape))
-        channel_axis = 1 if self.data_format == 'channels_first' else -1
+        channel_axis = self._channel_axis
         if input_shape[channel_axis] is None:
             raise ValueError('The channel dimension of the inputs '
                              'should be defined. Found `None`.')
@@ -1439,38 +2054,118 @@ class _SeparableConv(_Conv):
         # Set input spec.
         self.input_spec = InputSpec(ndim=self.rank + 2,
                                     axes={channel_axis: input_dim})
+        self._nhwc_fastpath = (self.rank == 2 and
+                               _needs_nhwc_transpose(self.data_format))
+        # Matrix view of the pointwise kernel for the row-blocked path,
+        # reshaped once here rather than on every call.
+        self._pointwise_kernel_2d = K.reshape(
+            self.pointwise_kernel,
+            (self.depth_multiplier * input_dim, self.filters))
         self.built = True
 
     def call(self, inputs):
-        if self.rank == 1:
-            outputs = K.separable_conv1d(
-                inputs,
-                self.depthwise_kernel,
-                self.pointwise_kernel,
-                data_format=self.data_format,
-                strides=self.strides,
-                padding=self.padding,
-                dilation_rate=self.dilation_rate)
-        if self.rank == 2:
-            outputs = K.separable_conv2d(
+        data_format = self.data_format
+        if self._nhwc_fastpath:
+            inputs = K.permute_dimensions(inputs, (0, 2, 3, 1))
+            data_format = 'channels_last'
+
+        if self._supports_tiling(inputs, data_format):
+            if not self._nhwc_fastpath:
+                return self._fused_separable_call(inputs, self.activation)
+            outputs = self._fused_separable_call(inputs)
+        else:
+            outputs = self._conv_fn(
                 inputs,
                 self.depthwise_kernel,
                 self.pointwise_kernel,
-                data_format=self.data_format,
+                data_format=data_format,
                 strides=self.strides,
                 padding=self.padding,
                 dilation_rate=self.dilation_rate)
 
-        if self.use_bias:
-            outputs = K.bias_add(
-                outputs,
-                self.bias,
-                data_format=self.data_format)
+            if self.use_bias:
+                outputs = K.bias_add(
+                    outputs,
+                    self.bias,
+                    data_format=data_format)
+
+        if self._nhwc_fastpath:
+            outputs = K.permute_dimensions(outputs, (0, 3, 1, 2))
 
         if self.activation is not None:
             return self.activation(outputs)
         return outputs
 
+    def _supports_tiling(self, inputs, data_format):
+        if (not self.row_tiling or data_format != 'channels_last' or
+                self.dilation_rate != (1, 1) or
+                self.padding not in ('valid', 'same')):
+            return False
+        rows, cols = K.int_shape(inputs)[1:3]
+        if rows is None or cols is None:
+            return False
+        out_rows = conv_utils.conv_output_length(rows, self.kernel_size[0],
+                                                 self.padding, self.strides[0])
+        return out_rows > self._tile_rows(inputs)
+
+    def _tile_rows(self, inputs):
+        """Number of output rows per block of `_fused_separable_call`."""
+        cols, input_dim = K.int_shape(inputs)[2:]
+        out_cols = conv_utils.conv_output_length(cols, self.kernel_size[1],
+                                                 self.padding, self.strides[1])
+        row_bytes = (out_cols * self.kernel_size[0] * self.kernel_size[1] *
+                     input_dim * np.dtype(K.dtype(inputs)).itemsize)
+        return max(1, min(_SEPARABLE_TILE_ROWS,
+                          _SEPARABLE_TILE_BYTES // row_bytes))
+
+    def _fused_separable_call(self, inputs, activation=None):
+        """Separable convolution computed one block of output rows at a time.
+
+        Each block goes through the depthwise convolution, the pointwise
+        matrix product, the bias and the activation before the next one
+        starts, so only a block of the depthwise output (whose depth is
+        `depth_multiplier * input_dim`) is alive at any time instead of
+        the whole intermediate feature map. Blocks are made short enough
+        for a backend lowering the depthwise step to im2col to keep its
+        patch matrix small, which matters for large and wide inputs.
+
+        The pointwise product is a plain 2D matrix product directly
+        followed by the bias and the activation, which the TensorFlow
+        graph optimizer fuses into a single node.
+
+        # Arguments
+            inputs: channels-last 4D input tensor with static spatial
+                dimensions.
+            activation: activation function applied to each block,
+                or `None`.
+
+        # Returns
+            The output tensor.
+        """
+        tile_rows = self._tile_rows(inputs)
+        inputs, out_rows, _ = _pad_inputs_2d(inputs, self.kernel_size,
+                                             self.strides, self.padding)
+        stride = self.strides[0]
+        tiles = []
+        for start in range(0, out_rows, tile_rows):
+            stop = min(start + tile_rows, out_rows)
+            tile = inputs[:, start * stride:
+                          (stop - 1) * stride + self.kernel_size[0]]
+            tile = K.depthwise_conv2d(tile, self.depthwise_kernel,
+                                      strides=self.strides,
+                                      padding='valid',
+                                      data_format='channels_last')
+            tile_shape = K.int_shape(tile)[1:3] + (self.filters,)
+            tile = K.dot(K.reshape(tile, (-1, K.int_shape(tile)[-1])),
+                         self._pointwise_kernel_2d)
+            if self.use_bias:
+                tile = K.bias_add(tile, self.bias,
+                                  data_format='channels_last')
+            if activation is not None:
+                tile = activation(tile)
+            tiles.append(K.reshape(tile, (-1,) + tile_shape))
+        return K.concatenate(tiles, axis=1)
+
     def get_config(self):
         config = super(_SeparableConv, self).get_config()
         config.pop('rank')
@@ -1490,6 +2185,8 @@ class _SeparableConv(_Conv):
             constraints.serialize(self.depthwise_constraint))
         config['pointwise_constraint'] = (
             constraints.serialize(self.pointwise_constraint))
+        if self.rank == 2:
+            config['row_tiling'] = self.row_tiling
         return config
 
 
@@ -1702,6 +2399,14 @@ class SeparableConv2D(_SeparableConv):
             (see [constraints](../constraints.md)).
         bias_constraint: Constraint function applied to the bias vector
             (see [constraints](../constraints.md)).
+        row_tiling: Boolean (2D only). If True and the inputs, once
+            channels-last, have static spatial dimensions, the
+            convolution, bias and activation are computed in blocks of
+            output rows that are concatenated at the end, instead of with
+            the backend separable convolution. This bounds the size of
+            the depthwise patches of each block, but the blocks may run
+            concurrently, training keeps the activations of all of them,
+            and the concatenation copies the output once more.
 
     # Input shape
         4D tensor with shape:
@@ -1741,6 +2446,7 @@ class SeparableConv2D(_SeparableConv):
                  depthwise_constraint=None,
                  pointwise_constraint=None,
                  bias_constraint=None,
+                 row_tiling=False,
                  **kwargs):
         super(SeparableConv2D, self).__init__(
             rank=2,
@@ -1763,8 +2469,95 @@ class SeparableConv2D(_SeparableConv):
             depthwise_constraint=depthwise_constraint,
             pointwise_constraint=pointwise_constraint,
             bias_constraint=bias_constraint,
+            row_tiling=row_tiling,
             **kwargs)
 
+    @staticmethod
+    def fuse_siblings(layers, inputs):
+        """Applies several sibling `SeparableConv2D` layers to the same inputs.
+
+        The depthwise kernels of the layers are concatenated so that a
+        single depthwise convolution is run, and the pointwise steps of
+        all the layers are then computed as one batched matrix product.
+        Each layer's bias and activation are applied to its own output.
+
+        This operates on backend tensors (e.g. inside the `call` of a custom
+        layer): the outputs are not Keras tensors and the layers'
+        activity regularizers are not applied.
+
+        # Arguments
+            layers: List of built `SeparableConv2D` layers sharing
+                `kernel_size`, `strides`, `padding`, `data_format`,
+                `dilation_rate`, `depth_multiplier` and `filters`.
+            inputs: Input tensor shared by all the layers. Its spatial
+                dimensions must be static.
+
+        # Returns
+            List of output tensors, one per layer, in the same order.
+
+        # Raises
+            ValueError: if the layers cannot be fused.
+        """
+        if not layers:
+            raise ValueError('`fuse_siblings` expects at least one layer.')
+        first = layers[0]
+        for layer in layers:
+            if type(layer) is not SeparableConv2D or not layer.built:
+                raise ValueError('`fuse_siblings` only fuses built '
+                                 '`SeparableConv2D` layers. '
+                                 'Received: ' + str(layer))
+            if (layer.kernel_size != first.kernel_size or
+                    layer.strides != first.strides or
+                    layer.padding != first.padding or
+                    layer.data_format != first.data_format or
+                    layer.dilation_rate != first.dilation_rate or
+                    layer.depth_multiplier != first.depth_multiplier or
+                    layer.filters != first.filters):
+                raise ValueError('Layers `' + first.name + '` and `' +
+                                 layer.name + '` do not share the same '
+                                 'convolution arguments and cannot be fused.')
+
+        if first.data_format == 'channels_first':
+            inputs = K.permute_dimensions(inputs, (0, 2, 3, 1))
+        if None in K.int_shape(inputs)[1:]:
+            raise ValueError('`fuse_siblings` requires inputs with static '
+                             'spatial dimensions. Received input shape: ' +
+                             str(K.int_shape(inputs)))
+        num_layers = len(layers)
+        depth_multiplier = first.depth_multiplier
+        depthwise_kernel = K.concatenate(
+            [layer.depthwise_kernel for layer in layers], axis=-1)
+        outputs = K.depthwise_conv2d(inputs, depthwise_kernel,
+                                     strides=first.strides,
+                                     padding=first.padding,
+                                     dilation_rate=first.dilation_rate,
+                                     data_format='channels_last')
+        rows, cols, channels = K.int_shape(outputs)[1:]
+        input_dim = channels // (num_layers * depth_multiplier)
+        # Channel `(c * num_layers + l) * depth_multiplier + m` is channel
+        # `c * depth_multiplier + m` of layer `l`: regroup them per layer.
+        outputs = K.reshape(outputs,
+                            (-1, input_dim, num_layers, depth_multiplier))
+        outputs = K.permute_dimensions(outputs, (2, 0, 1, 3))
+        outputs = K.reshape(outputs,
+                            (num_layers, -1, input_dim * depth_multiplier))
+        pointwise_kernel = K.stack(
+            [layer._pointwise_kernel_2d for layer in layers])
+        outputs = K.batch_dot(outputs, pointwise_kernel)
+
+        results = []
+        for i, layer in enumerate(layers):
+            output = K.reshape(outputs[i], (-1, rows, cols, layer.filters))
+            if layer.use_bias:
+                output = K.bias_add(output, layer.bias,
+                                    data_format='channels_last')
+            if layer.data_format == 'channels_first':
+                output = K.permute_dimensions(output, (0, 3, 1, 2))
+            if layer.activation is not None:
+                output = layer.activation(output)
+            results.append(output)
+        return results
+
 
 class DepthwiseConv2D(Conv2D):
     """Depthwise separable 2D convolution.
@@ -1830,6 +2623,13 @@ class DepthwiseConv2D(Conv2D):
             (see [constraints](../constraints.md)).
         bias_constraint: Constraint function applied to the bias vector
             (see [constraints](../constraints.md)).
+        lowering: `None` or `"direct"`. With `"direct"`, convolutions
+            without dilation and with static spatial dimensions are
+            computed by accumulating one shifted slice of the inputs per
+            kernel tap instead of with the backend depthwise convolution.
+            Each term has `depth_multiplier` times as many channels as the
+            inputs, so the temporaries grow with the multiplier.
+            Other cases fall back to the backend.
 
     # Input shape
         4D tensor with shape:
@@ -1865,6 +2665,7 @@ class DepthwiseConv2D(Conv2D):
                  activity_regularizer=None,
                  depthwise_constraint=None,
                  bias_constraint=None,
+                 lowering=None,
                  **kwargs):
         super(DepthwiseConv2D, self).__init__(
             filters=None,
@@ -1875,24 +2676,30 @@ class DepthwiseConv2D(Conv2D):
             dilation_rate=dilation_rate,
             activation=activation,
             use_bias=use_bias,
+            bias_initializer=bias_initializer,
             bias_regularizer=bias_regularizer,
             activity_regularizer=activity_regularizer,
             bias_constraint=bias_constraint,
+            lowering=lowering,
             **kwargs)
+        if lowering not in {None, 'direct'}:
+            raise ValueError('The `lowering` argument of `DepthwiseConv2D` '
+                             'must be None or "direct". '
+                             'Received: ' + str(lowering))
+        if self.separable:
+            raise ValueError('`DepthwiseConv2D` does not support '
+                             '`separable`.')
         self.depth_multiplier = depth_multiplier
         self.depthwise_initializer = initializers.get(depthwise_initializer)
         self.depthwise_regularizer = regularizers.get(depthwise_regularizer)
         self.depthwise_constraint = constraints.get(depthwise_constraint)
-        self.bias_initializer = initializers.get(bias_initializer)
+        self._channel_axis = 1 if self.data_format == 'channels_first' else 3
 
     def build(self, input_shape):
         if len(input_shape) < 4:
             raise ValueError('Inputs to `DepthwiseConv2D` should have rank 4. '
                              'Received input shape:', str(input_shape))
-        if self.data_format == 'channels_first':
-            channel_axis = 1
-        else:
-            channel_axis = 3
+        channel_axis = self._channel_axis
         if input_shape[channel_axis] is None:
             raise ValueError('The channel dimension of the inputs to '
                              '`DepthwiseConv2D` '
@@ -1920,48 +2727,74 @@ class DepthwiseConv2D(Conv2D):
             self.bias = None
         # Set input spec.
         self.input_spec = InputSpec(ndim=4, axes={channel_axis: input_dim})
+        self._nhwc_fastpath = _needs_nhwc_transpose(self.data_format)
         self.built = True
 
     def call(self, inputs, training=None):
-        outputs = K.depthwise_conv2d(
-            inputs,
-            self.depthwise_kernel,
-            strides=self.strides,
-            padding=self.padding,
-            dilation_rate=self.dilation_rate,
-            data_format=self.data_format)
+        if self.compute_dtype is not None:
+            dtype = K.dtype(inputs)
+            inputs = K.cast(inputs, self.compute_dtype)
+
+        data_format = self.data_format
+        if self._nhwc_fastpath:
+            inputs = K.permute_dimensions(inputs, (0, 2, 3, 1))
+            data_format = 'channels_last'
+
+        if self._supports_direct(inputs, data_format):
+            outputs = _direct_depthwise_conv2d(
+                inputs,
+                self._compute_weight(self.depthwise_kernel),
+                strides=self.strides,
+                padding=self.padding,
+                data_format=data_format)
+        else:
+            outputs = K.depthwise_conv2d(
+                inputs,
+                self._compute_weight(self.depthwise_kernel),
+                strides=self.strides,
+                padding=self.padding,
+                dilation_rate=self.dilation_rate,
+                data_format=data_format)
 
         if self.use_bias:
             outputs = K.bias_add(
                 outputs,
-                self.bias,
-                data_format=self.data_format)
+                self._compute_weight(self.bias),
+                data_format=data_format)
+
+        if self._nhwc_fastpath:
+            outputs = K.permute_dimensions(outputs, (0, 3, 1, 2))
+
+        if self.compute_dtype is not None:
+            outputs = K.cast(outputs, dtype)
 
         if self.activation is not None:
             return self.activation(outputs)
 
         return outputs
 
+    def _supports_direct(self, inputs, data_format):
+        if (self.lowering != 'direct' or
+                self.dilation_rate != (1, 1) or
+                self.padding not in ('valid', 'same')):
+            return False
+        if data_format == 'channels_first':
+            space = K.int_shape(inputs)[2:]
+        else:
+            space = K.int_shape(inputs)[1:3]
+        return None not in space
+
     def compute_output_shape(self, input_shape):
-        if self.data_format == 'channels_last':
-            space = input_shape[1:-1]
-            out_filters = input_shape[3] * self.depth_multiplier
-        elif self.data_format == 'channels_first':
+        if self.data_format == 'channels_first':
             space = input_shape[2:]
-            out_filters = input_shape[1] * self.depth_multiplier
-        new_space = []
-        for i in range(len(space)):
-            new_dim = conv_utils.conv_output_length(
-                space[i],
-                self.kernel_size[i],
-                padding=self.padding,
-                stride=self.strides[i],
-                dilation=self.dilation_rate[i])
-            new_space.append(new_dim)
-        if self.data_format == 'channels_last':
-            return (input_shape[0], new_space[0], new_space[1], out_filters)
-        elif self.data_format == 'channels_first':
-            return (input_shape[0], out_filters, new_space[0], new_space[1])
+        else:
+            space = input_shape[1:3]
+        input_dim = input_shape[self._channel_axis]
+        out_filters = (None if input_dim is None
+                       else input_dim * self.depth_multiplier)
+        new_space = tuple(self._output_space(space))
+        return transpose_shape((input_shape[0],) + new_space + (out_filters,),
+                               self.data_format, spatial_axes=(1, 2))
 
     def get_config(self):
         config = super(DepthwiseConv2D, self).get_config()
@@ -1979,6 +2812,82 @@ class DepthwiseConv2D(Conv2D):
         return config
 
 
+def _upsample_nearest(inputs, size, data_format):
+    """Nearest-neighbour upsampling computed as a broadcast copy.
+
+    Each spatial axis of length `n` is split into `(n, 1)`, tiled to
+    `(n, factor)` and merged back, which repeats every element `factor`
+    times without gathering or computing source coordinates.
+
+    # Arguments
+        inputs: Input tensor with `len(size)` spatial axes.
+        size: Tuple of ints, the upsampling factor of each spatial axis.
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    # Returns
+        The upsampled tensor.
+    """
+    ndim = len(size) + 2
+    first_spatial_axis = 2 if data_format == 'channels_first' else 1
+    lengths = _static_or_dynamic_shape(inputs, range(1, ndim))
+    split_shape = [-1]
+    multiples = [1]
+    output_shape = [-1]
+    for axis, length in enumerate(lengths, 1):
+        split_shape.append(length)
+        multiples.append(1)
+        factor = 1
+        if first_spatial_axis <= axis < first_spatial_axis + len(size):
+            factor = size[axis - first_spatial_axis]
+            split_shape.append(1)
+            multiples.append(factor)
+        output_shape.append(length * factor)
+    outputs = K.tile(K.reshape(inputs, split_shape), multiples)
+    return K.reshape(outputs, output_shape)
+
+
+def _upsample_bilinear(inputs, size, data_format):
+    """Bilinear upsampling by integer factors, as TensorFlow computes it.
+
+    Output position `i * factor + j` of an axis of length `n` is
+    `x[i] + (x[min(i + 1, n - 1)] - x[i]) * j / factor`. The weights only
+    depend on `j`, so they are a constant of `factor` values broadcast
+    against the inputs and their copy shifted by one step, and neither
+    source coordinates nor gathers are computed. The spatial axes are
+    interpolated one after the other.
+
+    # Arguments
+        inputs: Input tensor with `len(size)` spatial axes.
+        size: Tuple of ints, the upsampling factor of each spatial axis.
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    # Returns
+        The upsampled tensor.
+    """
+    ndim = len(size) + 2
+    first_spatial_axis = 2 if data_format == 'channels_first' else 1
+    outputs = inputs
+    for i, factor in enumerate(size):
+        if factor == 1:
+            continue
+        axis = first_spatial_axis + i
+        lengths = _static_or_dynamic_shape(outputs, range(1, ndim))
+        head = (slice(None),) * axis
+        shifted = K.concatenate([outputs[head + (slice(1, None),)],
+                                 outputs[head + (slice(-1, None),)]],
+                                axis=axis)
+        weights_shape = [1] * (ndim + 1)
+        weights_shape[axis + 1] = factor
+        weights = K.constant(
+            np.arange(factor).reshape(weights_shape) / float(factor),
+            dtype=K.dtype(inputs))
+        outputs = (K.expand_dims(outputs, axis + 1) +
+                   K.expand_dims(shifted - outputs, axis + 1) * weights)
+        lengths[axis - 1] = lengths[axis - 1] * factor
+        outputs = K.reshape(outputs, [-1] + lengths)
+    return outputs
+
+
 class _UpSampling(Layer):
     """Abstract nD UpSampling layer (private, used as implementation base).
 
@@ -2000,28 +2909,25 @@ class _UpSampling(Layer):
         self.size = size
         self.data_format = K.normalize_data_format(data_format)
         self.input_spec = InputSpec(ndim=self.rank + 2)
+        # Factor of every axis of the inputs, used to compute output shapes.
+        self._size_all_dims = transpose_shape((1,) + self.size + (1,),
+                                              self.data_format,
+                                              list(range(1, 1 + self.rank)))
         super(_UpSampling, self).__init__(**kwargs)
 
     def call(self, inputs):
         raise NotImplementedError
 
     def compute_output_shape(self, input_shape):
-        size_all_dims = (1,) + self.size + (1,)
-        spatial_axes = list(range(1, 1 + self.rank))
-        size_all_dims = transpose_shape(size_all_dims,
-                                        self.data_format,
-                                        spatial_axes)
-        output_shape = list(input_shape)
-        for dim in range(len(output_shape)):
-            if output_shape[dim] is not None:
-                output_shape[dim] *= size_all_dims[dim]
-        return tuple(output_shape)
+        return tuple(None if length is None else length * size
+                     for length, size in zip(input_shape,
+                                             self._size_all_dims))
 
     def get_config(self):
         config = {'size': self.size,
                   'data_format': self.data_format}
         base_config = super(_UpSampling, self).get_config()
-        return dict(list(base_config.items()) + list(config.items()))
+        return dict(base_config, **config)
 
 
 class UpSampling1D(_UpSampling):
@@ -2044,8 +2950,7 @@ class UpSampling1D(_UpSampling):
         super(UpSampling1D, self).__init__((int(size),), 'channels_last', **kwargs)
 
     def call(self, inputs):
-        output = K.repeat_elements(inputs, self.size[0], axis=1)
-        return output
+        return _upsample_nearest(inputs, self.size, self.data_format)
 
     def get_config(self):
         config = super(UpSampling1D, self).get_config()
@@ -2103,6 +3008,12 @@ class UpSampling2D(_UpSampling):
         self.interpolation = interpolation
 
     def call(self, inputs):
+        if self.interpolation == 'nearest':
+            return _upsample_nearest(inputs, self.size, self.data_format)
+        if K.backend() == 'tensorflow':
+            # Same values as `tf.image.resize_bilinear`; the other
+            # backends interpolate differently and keep their own op.
+            return _upsample_bilinear(inputs, self.size, self.data_format)
         return K.resize_images(inputs, self.size[0], self.size[1],
                                self.data_format, self.interpolation)
 
@@ -2153,9 +3064,7 @@ class UpSampling3D(_UpSampling):
         super(UpSampling3D, self).__init__(normalized_size, data_format, **kwargs)
 
     def call(self, inputs):
-        return K.resize_volumes(inputs,
-                                self.size[0], self.size[1], self.size[2],
-                                self.data_format)
+        return _upsample_nearest(inputs, self.size, self.data_format)
 
 
 class _ZeroPadding(Layer):
@@ -2180,28 +3089,29 @@ class _ZeroPadding(Layer):
         self.padding = padding
         self.data_format = K.normalize_data_format(data_format)
         self.input_spec = InputSpec(ndim=self.rank + 2)
+        # Total padding of every axis of the inputs, used to compute
+        # output shapes.
+        self._padding_all_dims = transpose_shape(
+            (0,) + tuple(sum(pad) for pad in self.padding) + (0,),
+            self.data_format,
+            list(range(1, 1 + self.rank)))
+        # Zero padding is the identity: the inputs are returned uncopied.
+        self._is_identity = not any(self._padding_all_dims)
         super(_ZeroPadding, self).__init__(**kwargs)
 
     def call(self, inputs):
         raise NotImplementedError
 
     def compute_output_shape(self, input_shape):
-        padding_all_dims = ((0, 0),) + self.padding + ((0, 0),)
-        spatial_axes = list(range(1, 1 + self.rank))
-        padding_all_dims = transpose_shape(padding_all_dims,
-                                           self.data_format,
-                                           spatial_axes)
-        output_shape = list(input_shape)
-        for dim in range(len(output_shape)):
-            if output_shape[dim] is not None:
-                output_shape[dim] += sum(padding_all_dims[dim])
-        return tuple(output_shape)
+        return tuple(None if length is None else length + padding
+                     for length, padding in zip(input_shape,
+                                                self._padding_all_dims))
 
     def get_config(self):
         config = {'padding': self.padding,
                   'data_format': self.data_format}
         base_config = super(_ZeroPadding, self).get_config()
-        return dict(list(base_config.items()) + list(config.items()))
+        return dict(base_config, **config)
 
 
 class ZeroPadding1D(_ZeroPadding):
@@ -2230,6 +3140,8 @@ class ZeroPadding1D(_ZeroPadding):
                                             **kwargs)
 
     def call(self, inputs):
+        if self._is_identity:
+            return inputs
         return K.temporal_padding(inputs, padding=self.padding[0])
 
     def get_config(self):
@@ -2310,6 +3222,8 @@ class ZeroPadding2D(_ZeroPadding):
                                             **kwargs)
 
     def call(self, inputs):
+        if self._is_identity:
+            return inputs
         return K.spatial_2d_padding(inputs,
                                     padding=self.padding,
                                     data_format=self.data_format)
@@ -2390,11 +3304,66 @@ class ZeroPadding3D(_ZeroPadding):
                                             **kwargs)
 
     def call(self, inputs):
+        if self._is_identity:
+            return inputs
         return K.spatial_3d_padding(inputs,
                                     padding=self.padding,
                                     data_format=self.data_format)
 
 
+def _count_sketch_index(d, input_dim):
+    """Draws the random target indices of a count sketch.
+
+    # Arguments
+        d: dimension of the sketch.
+        input_dim: dimension of the sketched vectors.
+
+    # Returns
+        The target index in `[0, d)` of every input component,
+        as an int32 array of length `input_dim`.
+    """
+    return np.random.randint(0, d, size=(input_dim,)).astype('int32')
+
+
+def _count_sketch_sign(input_dim):
+    """Draws the random signs of a count sketch.
+
+    # Arguments
+        input_dim: dimension of the sketched vectors.
+
+    # Returns
+        The sign (`-1` or `1`) of every input component,
+        as an int32 array of length `input_dim`.
+    """
+    return (np.random.randint(0, 2, size=(input_dim,)) * 2 - 1).astype('int32')
+
+
+def _count_sketch_modes(h, s, x, d):
+    """Count sketches of several modes computed with a single operator.
+
+    The inputs of all the modes are concatenated, and the hashes of mode
+    `i` are offset by `i * d`, so that one count sketch of dimension
+    `len(x) * d` holds the sketch of every mode side by side.
+
+    # Arguments
+        h: List of the target index vectors of the modes.
+        s: List of the sign vectors of the modes.
+        x: List of the 2D input tensors of the modes.
+        d: dimension of each sketch.
+
+    # Returns
+        List of the sketches, one `(batch, d)` tensor per mode.
+    """
+    if len(x) == 1:
+        return [K.count_sketch(h[0], s[0], x[0], d)]
+    sketches = K.count_sketch(
+        K.concatenate([h_i + i * d for i, h_i in enumerate(h)], axis=0),
+        K.concatenate(list(s), axis=0),
+        K.concatenate(list(x), axis=1),
+        len(x) * d)
+    return [sketches[:, i * d:(i + 1) * d] for i in range(len(x))]
+
+
 class CompactBilinearPooling(Layer):
     """Compact Bilinear Pooling
     TODO: Test this layer
@@ -2441,12 +3410,13 @@ class CompactBilinearPooling(Layer):
         assert self.nmodes == 2
         self.shape_in = input_shapes
         for i in range(self.nmodes):
+            input_dim = input_shapes[i][1]
             if self.h[i] is None:
-                self.h[i] = np.random.random_integers(0, self.d - 1, size=(input_shapes[i][1],))
-                self.h[i] = K.variable(self.h[i], dtype='int64', name='h' + str(i))
+                h = _count_sketch_index(self.d, input_dim)
+                self.h[i] = K.variable(h, dtype='int32', name='h' + str(i))
             if self.s[i] is None:
-                self.s[i] = (np.floor(np.random.uniform(0, 2, size=(input_shapes[i][1],))) * 2 - 1).astype('int64')
-                self.s[i] = K.variable(self.s[i], dtype='int64', name='s' + str(i))
+                s = _count_sketch_sign(input_dim)
+                self.s[i] = K.variable(s, dtype='int32', name='s' + str(i))
         self.non_trainable_weights = [self.h[i] for i in range(self.nmodes)] + [self.s[i] for i in range(self.nmodes)]
 
         self.built = True
@@ -2463,34 +3433,24 @@ class CompactBilinearPooling(Layer):
         return to_return  # +[None]
 
     def multimodal_compact_bilinear(self, x):
-        v = [[]] * self.nmodes
-
         if self.conv_type == 'conv':
-            for i in range(self.nmodes):
-                v[i] = K.count_sketch(self.h[i], self.s[i], x[i], self.d)
+            v = _count_sketch_modes(self.h, self.s, x, self.d)
             out = K.conv1d(v[0], v[1])
 
         elif self.conv_type == 'fft':
-            raise NotImplementedError()
-            fft_v = [[]] * self.nmodes
-            acum_fft = 1.0
+            # Circular convolution of the sketches, computed as the product
+            # of their real-input spectra (`d // 2 + 1` complex values).
+            if K.backend() != 'tensorflow':
+                raise NotImplementedError('The `fft` conv_type is only '
+                                          'implemented with the TensorFlow '
+                                          'backend.')
+            import tensorflow as tf
+            v = _count_sketch_modes(self.h, self.s, x, self.d)
+            acum_fft = None
             for i in range(self.nmodes):
-                '''
-                v[i] = K.count_sketch(self.h[i], self.s[i], x[i], self.d)
-                fft_v[i] = K.fft(v[i])
-                acum_fft *= fft_v[i]
-                '''
-                v[i] = K.count_sketch(self.h[i], self.s[i], x[i], self.d)
-                zeros_pad = K.zeros_like(v[i])[:, :-1]
-                v_in = K.concatenate([zeros_pad,
-                                      v[i],
-                                      zeros_pad], axis=1)
-                fft_v[i] = K.fft(v_in)
-                prev = K.cast(K.floor(self.d / 2.), 'int16')
-                post = K.cast(K.ceil(self.d / 2.), 'int16')
-                acum_fft *= K.concatenate((fft_v[i][:, -post:], fft_v[i][:, :prev]), axis=1)
-
-            out = K.cast(K.ifft(acum_fft), dtype='float32')
+                fft_v = tf.spectral.rfft(v[i])
+                acum_fft = fft_v if acum_fft is None else acum_fft * fft_v
+            out = tf.spectral.irfft(acum_fft, fft_length=[self.d])
 
         else:
             raise NotImplementedError()
@@ -2506,15 +3466,18 @@ class CompactBilinearPooling(Layer):
         if type(x) is not list or len(x) < 2:
             raise Exception('CompactBilinearPooling must be called on a list of tensors '
                             '(at least 2). Got: ' + str(x))
-        if len(self.shape_in[0]) > 2:
-            x = [x[i].dimshuffle(tuple([0] + range(2, len(self.shape_in[0])) + [1])) for i in range(self.nmodes)]
-            x = [K.reshape(x[i], tuple([-1] + [self.shape_in[0][1]])) for i in range(self.nmodes)]
-            # x = [K.reshape(K.dimshuffle(x[i], tuple([0]+range(2,len(self.shape_in))+[1])), tuple([-1] + [self.shape_in[1]])) for i in range(self.nmodes)]
+        ndim = len(self.shape_in[0])
+        if ndim > 2:
+            # Every spatial position is an input vector: move the channels
+            # last and flatten the batch and spatial axes together.
+            to_last = (0,) + tuple(range(2, ndim)) + (1,)
+            x = [K.reshape(K.permute_dimensions(x[i], to_last),
+                           (-1, self.shape_in[i][1]))
+                 for i in range(self.nmodes)]
         y = self.multimodal_compact_bilinear(x)
-        if len(self.shape_in[0]) > 2:
-            y = K.reshape(y, tuple([-1] + self.shape_in[0][2:] + [self.d]))
-            y.dimshuffle(tuple([0, -1] + range(1, len(self.shape_in[0]) - 1)))
-            # y = K.dimshuffle(K.reshape(y, tuple([-1] + self.shape_in[0][2:] + [self.d])), tuple([0,-1]+range(1,len(self.shape_in)-1)))
+        if ndim > 2:
+            y = K.reshape(y, (-1,) + tuple(self.shape_in[0][2:]) + (self.d,))
+            y = K.permute_dimensions(y, (0, ndim - 1) + tuple(range(1, ndim - 1)))
         if self.return_extra:
             return y + self.h + self.s
         return y
@@ -2524,7 +3487,7 @@ class CompactBilinearPooling(Layer):
                   'return_extra': self.return_extra,
                   'conv_type': self.conv_type}
         base_config = super(CompactBilinearPooling, self).get_config()
-        return dict(list(base_config.items()) + list(config.items()))
+        return dict(base_config, **config)
 
     def get_output_shape_for(self, input_shape):
         assert type(input_shape) is list  # must have mutiple input shape tuples
@@ -2589,7 +3552,17 @@ class BilinearPooling(Layer):
             return input_mask[0]
 
     def multimodal_bilinear(self, x):
-        v = [[]] * self.nmodes
+        if K.backend() == 'tensorflow':
+            # The inputs are real, so only the `n // 2 + 1` non-redundant
+            # frequencies are computed and `irfft` returns a real output.
+            import tensorflow as tf
+            n = K.int_shape(x[0])[-1]
+            if n is None:
+                n = K.shape(x[0])[-1]
+            acum_fft = tf.spectral.rfft(x[0])
+            for i in range(1, self.nmodes):
+                acum_fft = acum_fft * tf.spectral.rfft(x[i])
+            return tf.spectral.irfft(acum_fft, fft_length=[n])
         acum_fft = 1.0
         for i in range(self.nmodes):
             acum_fft = acum_fft * K.fft(x[i])
@@ -2603,7 +3576,7 @@ class BilinearPooling(Layer):
 
     def get_config(self):
         base_config = super(BilinearPooling, self).get_config()
-        return dict(list(base_config.items()))
+        return base_config
 
     def get_output_shape_for(self, input_shape):
         assert type(input_shape) is list  # must have mutiple input shape tuples
@@ -2651,12 +3624,13 @@ class CountSketch(Layer):
             self.trainable_weights = []
             self.nmodes = len(input_shapes)
             for i in range(self.nmodes):
+                input_dim = input_shapes[i][1]
                 if self.h[i] is None:
-                    self.h[i] = np.random.random_integers(0, self.d - 1, size=(input_shapes[i][1],))
-                    self.h[i] = K.variable(self.h[i], dtype='int64', name='h' + str(i))
+                    h = _count_sketch_index(self.d, input_dim)
+                    self.h[i] = K.variable(h, dtype='int32', name='h' + str(i))
                 if self.s[i] is None:
-                    self.s[i] = (np.floor(np.random.uniform(0, 2, size=(input_shapes[i][1],))) * 2 - 1).astype('int64')
-                    self.s[i] = K.variable(self.s[i], dtype='int64', name='s' + str(i))
+                    s = _count_sketch_sign(input_dim)
+                    self.s[i] = K.variable(s, dtype='int32', name='s' + str(i))
         self.built = True
 
     def compute_mask(self, input, input_mask=None):
@@ -2672,10 +3646,7 @@ class CountSketch(Layer):
         return to_return
 
     def compact(self, x):
-        v = [[]] * self.nmodes
-        for i in range(self.nmodes):
-            v[i] = K.count_sketch(self.h[i], self.s[i], x[i], self.d)
-        return v
+        return _count_sketch_modes(self.h, self.s, x, self.d)
 
     def call(self, x, mask=None):
         if type(x) is not list or len(x) <= 1:
@@ -2689,7 +3660,7 @@ class CountSketch(Layer):
         config = {'d': self.d,
                   'return_extra': self.return_extra}
         base_config = super(CountSketch, self).get_config()
-        return dict(list(base_config.items()) + list(config.items()))
+        return dict(base_config, **config)
 
     def get_output_shape_for(self, input_shape):
         assert type(input_shape) is list  # must have mutiple input shape tuples
@@ -2730,39 +3701,38 @@ class _Cropping(Layer):
         self.cropping = cropping
         self.data_format = K.normalize_data_format(data_format)
         self.input_spec = InputSpec(ndim=2 + self.rank)
+        spatial_axes = list(range(1, 1 + self.rank))
+        # Slices of every axis of the inputs, and total cropping of every
+        # axis, used to compute output shapes.
+        self._slices = transpose_shape(
+            (slice(None),) +
+            tuple(slice(start, -end if end else None)
+                  for start, end in self.cropping) +
+            (slice(None),),
+            self.data_format,
+            spatial_axes)
+        self._cropping_all_dims = transpose_shape(
+            (0,) + tuple(sum(crop) for crop in self.cropping) + (0,),
+            self.data_format,
+            spatial_axes)
+        # Zero cropping is the identity: the inputs are returned uncopied.
+        self._is_identity = not any(self._cropping_all_dims)
 
     def call(self, inputs):
-        slices_dims = []
-        for start, end in self.cropping:
-            if end == 0:
-                end = None
-            else:
-                end = -end
-            slices_dims.append(slice(start, end))
-
-        slices = [slice(None)] + slices_dims + [slice(None)]
-        slices = tuple(slices)
-        spatial_axes = list(range(1, 1 + self.rank))
-        slices = transpose_shape(slices, self.data_format, spatial_axes)
-        return inputs[slices]
+        if self._is_identity:
+            return inputs
+        return inputs[self._slices]
 
     def compute_output_shape(self, input_shape):
-        cropping_all_dims = ((0, 0),) + self.cropping + ((0, 0),)
-        spatial_axes = list(range(1, 1 + self.rank))
-        cropping_all_dims = transpose_shape(cropping_all_dims,
-                                            self.data_format,
-                                            spatial_axes)
-        output_shape = list(input_shape)
-        for dim in range(len(output_shape)):
-            if output_shape[dim] is not None:
-                output_shape[dim] -= sum(cropping_all_dims[dim])
-        return tuple(output_shape)
+        return tuple(None if length is None else length - cropping
+                     for length, cropping in zip(input_shape,
+                                                 self._cropping_all_dims))
 
     def get_config(self):
         config = {'cropping': self.cropping,
                   'data_format': self.data_format}
         base_config = super(_Cropping, self).get_config()
-        return dict(list(base_config.items()) + list(config.items()))
+        return dict(base_config, **config)
 
 
 class Cropping1D(_Cropping):
@@ -2785,7 +3755,7 @@ class Cropping1D(_Cropping):
     """
 
     def __init__(self, cropping=(1, 1), **kwargs):
-        normalized_cropping = (conv_utils.normalize_tuple(cropping, 2, 'cropping'),)
+        normalized_cropping = (_normalize_tuple(cropping, 2, 'cropping'),)
         super(Cropping1D, self).__init__(normalized_cropping,
                                          'channels_last',
                                          **kwargs)
@@ -2861,10 +3831,10 @@ class Cropping2D(_Cropping):
             if len(cropping) != 2:
                 raise ValueError('`cropping` should have two elements. '
                                  'Found: ' + str(cropping))
-            height_cropping = conv_utils.normalize_tuple(
+            height_cropping = _normalize_tuple(
                 cropping[0], 2,
                 '1st entry of cropping')
-            width_cropping = conv_utils.normalize_tuple(
+            width_cropping = _normalize_tuple(
                 cropping[1], 2,
                 '2nd entry of cropping')
             normalized_cropping = (height_cropping, width_cropping)
@@ -2938,12 +3908,12 @@ class Cropping3D(_Cropping):
             if len(cropping) != 3:
                 raise ValueError('`cropping` should have 3 elements. '
                                  'Found: ' + str(cropping))
-            dim1_cropping = conv_utils.normalize_tuple(cropping[0], 2,
-                                                       '1st entry of cropping')
-            dim2_cropping = conv_utils.normalize_tuple(cropping[1], 2,
-                                                       '2nd entry of cropping')
-            dim3_cropping = conv_utils.normalize_tuple(cropping[2], 2,
-                                                       '3rd entry of cropping')
+            dim1_cropping = _normalize_tuple(cropping[0], 2,
+                                             '1st entry of cropping')
+            dim2_cropping = _normalize_tuple(cropping[1], 2,
+                                             '2nd entry of cropping')
+            dim3_cropping = _normalize_tuple(cropping[2], 2,
+                                             '3rd entry of cropping')
             normalized_cropping = (dim1_cropping, dim2_cropping, dim3_cropping)
         else:
             raise ValueError(
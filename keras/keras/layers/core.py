@@ -142,7 +142,6 @@ class GuidedDropout(Layer):
 
     """Applies a guided Dropout to the input, where the output activations are set
     to 0 given by the weights of the layer.
-    # TODO: Test this layer
 
     # Arguments:
         weights_shape: (num_dropout_matrices, num_features)
@@ -152,25 +151,25 @@ class GuidedDropout(Layer):
     def __init__(self, weights_shape, weights=None, **kwargs):
         self.weights_shape = weights_shape
         self.initial_weights = [weights]
-        self.init = initializers.get('uniform', dim_ordering='th')
+        self.init = initializers.get('uniform')
         super(GuidedDropout, self).__init__(**kwargs)
 
     def build(self, input_shape):
-        self.W = self.init(self.weights_shape,
-                           name='{}_W'.format(self.name))
-        self.trainable_weights = [self.W]
+        self.W = self.add_weight(shape=self.weights_shape,
+                                 initializer=self.init,
+                                 name='W',
+                                 trainable=False)
 
         # initialize weights
         if (self.initial_weights[0] is not None):
             self.set_weights(self.initial_weights)
-
-        self.trainable = False
+        self.built = True
 
     def call(self, inputs, mask=None):
         modulated_input = inputs[0]
         modulator_input = inputs[1]
 
-        modulated_output = modulated_input * self.W[K.argmax(modulator_input, axis=1), :]
+        modulated_output = modulated_input * K.gather(self.W, K.argmax(modulator_input, axis=1))
 
         return modulated_output
 
@@ -1510,6 +1510,18 @@ class TestBackend(object):
             K.resize_volumes(K.variable(xval), 2, 2, 2,
                              data_format='channels_middle')
 
+    @pytest.mark.skipif(K.backend() == 'cntk',
+                        reason='cntk does not implement count_sketch.')
+    def test_count_sketch(self):
+        d = 7
+        h = np.random.randint(d, size=(20,)).astype('int32')
+        s = (2 * np.random.randint(2, size=(20,)) - 1).astype('int32')
+        x = np.random.random((4, 20)).astype(K.floatx())
+        z = K.eval(K.count_sketch(K.variable(h, dtype='int32'),
+                                  K.variable(s, dtype='int32'),
+                                  K.variable(x), d))
+        assert_allclose(z, KNP.count_sketch(h, s, x, d), atol=1e-05)
+
     def test_temporal_padding(self):
         check_single_tensor_operation('temporal_padding', (4, 3, 3),
                                       WITH_NP)
@@ -186,6 +186,219 @@ def test_convolution_2d_invalid():
             batch_input_shape=(None, None, 5, None))])
 
 
+@pytest.mark.parametrize(
+    'lowering,strides,padding,data_format',
+    [(lowering, strides, padding, data_format)
+     for lowering in ['mec', 'direct']
+     for padding in ['valid', 'same']
+     for strides in [(1, 1), (2, 2)]
+     for data_format in ['channels_first', 'channels_last']
+     if not (padding == 'same' and strides != (1, 1))]
+)
+def test_convolution_2d_lowering(lowering, strides, padding, data_format):
+    num_samples = 2
+    filters = 2
+    stack_size = 3
+    kernel_size = (3, 2)
+    num_row = 7
+    num_col = 6
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, num_row, num_col)
+    else:
+        input_shape = (num_samples, num_row, num_col, stack_size)
+    kwargs = {'filters': filters,
+              'kernel_size': kernel_size,
+              'padding': padding,
+              'strides': strides,
+              'data_format': data_format}
+
+    layer_test(convolutional.Conv2D,
+               kwargs=dict(kwargs, lowering=lowering),
+               input_shape=input_shape)
+
+    inputs = np.random.random(input_shape)
+    layer = convolutional.Conv2D(**kwargs)
+    lowered_layer = convolutional.Conv2D(lowering=lowering, **kwargs)
+    layer.build(input_shape)
+    lowered_layer.build(input_shape)
+    lowered_layer.set_weights(layer.get_weights())
+    outputs = K.eval(layer(K.variable(inputs)))
+    lowered_outputs = K.eval(lowered_layer(K.variable(inputs)))
+    assert_allclose(lowered_outputs, outputs, atol=1e-5)
+
+    with pytest.raises(ValueError):
+        convolutional.Conv2D(lowering='im2col', **kwargs)
+
+
+@pytest.mark.parametrize(
+    'padding,data_format,num_row',
+    [(padding, data_format, num_row)
+     for padding in ['valid', 'same']
+     for data_format in ['channels_first', 'channels_last']
+     for num_row in [7, 8]]
+)
+def test_convolution_2d_winograd_lowering(padding, data_format, num_row):
+    num_samples = 2
+    stack_size = 3
+    num_col = 6
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, num_row, num_col)
+    else:
+        input_shape = (num_samples, num_row, num_col, stack_size)
+    kwargs = {'filters': 2,
+              'kernel_size': (3, 3),
+              'padding': padding,
+              'data_format': data_format}
+
+    layer_test(convolutional.Conv2D,
+               kwargs=dict(kwargs, lowering='winograd'),
+               input_shape=input_shape)
+
+    inputs = np.random.random(input_shape)
+    layer = convolutional.Conv2D(**kwargs)
+    winograd_layer = convolutional.Conv2D(lowering='winograd', **kwargs)
+    layer.build(input_shape)
+    winograd_layer.build(input_shape)
+    winograd_layer.set_weights(layer.get_weights())
+    outputs = K.eval(layer(K.variable(inputs)))
+    winograd_outputs = K.eval(winograd_layer(K.variable(inputs)))
+    assert_allclose(winograd_outputs, outputs, atol=1e-5)
+
+
+@pytest.mark.parametrize('data_format',
+                         ['channels_first', 'channels_last'])
+def test_convolution_2d_separable(data_format):
+    num_samples = 2
+    stack_size = 3
+    filters = 4
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, 7, 6)
+    else:
+        input_shape = (num_samples, 7, 6, stack_size)
+    kwargs = {'filters': filters,
+              'kernel_size': (3, 3),
+              'padding': 'same',
+              'data_format': data_format,
+              'separable': True}
+
+    layer_test(convolutional.Conv2D,
+               kwargs=kwargs,
+               input_shape=input_shape)
+
+    layer = convolutional.Conv2D(**kwargs)
+    layer.build(input_shape)
+    assert [K.int_shape(w) for w in layer.weights] == [
+        (3, 3, stack_size, 1), (1, 1, stack_size, filters), (filters,)]
+
+    with pytest.raises(ValueError):
+        convolutional.Conv2D(lowering='mec', **kwargs)
+    with pytest.raises(ValueError):
+        convolutional.Conv3D(filters, 3, separable=True)
+
+
+def test_convolution_unsupported_options():
+    with pytest.raises(ValueError):
+        convolutional.Conv1D(2, 3, lowering='mec')
+    with pytest.raises(ValueError):
+        convolutional.Conv3D(2, 3, lowering='mec')
+    with pytest.raises(ValueError):
+        convolutional.Conv3DTranspose(2, 3, lowering='mec')
+    with pytest.raises(ValueError):
+        convolutional.SeparableConv1D(2, 3, compute_dtype='float16')
+    with pytest.raises(ValueError):
+        convolutional.SeparableConv1D(2, 3, separable=True)
+    with pytest.raises(ValueError):
+        convolutional.Conv2DTranspose(2, 3, separable=True)
+    with pytest.raises(ValueError):
+        convolutional.DepthwiseConv2D(3, separable=True)
+    with pytest.raises(ValueError):
+        convolutional.SeparableConv2D(2, 3, lowering='mec')
+    with pytest.raises(ValueError):
+        convolutional.DepthwiseConv2D(3, lowering='winograd')
+
+    input_shape = (2, 7, 6, 3)
+    layers = [convolutional.Conv2D(2, 3),
+              convolutional.Conv2D(2, 3, compute_dtype='float16')]
+    for layer in layers:
+        layer.build(input_shape)
+    with pytest.raises(ValueError):
+        convolutional.Conv2D.fuse_siblings(
+            layers, K.variable(np.random.random(input_shape)))
+
+
+@pytest.mark.skipif(K.backend() != 'tensorflow',
+                    reason='Requires float16 convolutions.')
+@pytest.mark.parametrize('layer_class,strides', [
+    (convolutional.Conv2D, (1, 1)),
+    (convolutional.Conv2DTranspose, (1, 1)),
+    (convolutional.Conv2DTranspose, (2, 2)),
+    (convolutional.DepthwiseConv2D, (1, 1)),
+])
+def test_convolution_2d_compute_dtype(layer_class, strides):
+    num_samples = 2
+    stack_size = 3
+    input_shape = (num_samples, 7, 6, stack_size)
+    kwargs = {'kernel_size': (3, 3),
+              'strides': strides,
+              'data_format': 'channels_last',
+              'bias_initializer': 'ones'}
+    if layer_class is not convolutional.DepthwiseConv2D:
+        kwargs['filters'] = 2
+
+    layer_test(layer_class,
+               kwargs=dict(kwargs, compute_dtype='float16'),
+               input_shape=input_shape)
+
+    inputs = np.random.random(input_shape)
+    layer = layer_class(**kwargs)
+    half_layer = layer_class(compute_dtype='float16', **kwargs)
+    layer.build(input_shape)
+    half_layer.build(input_shape)
+    half_layer.set_weights(layer.get_weights())
+    outputs = half_layer(K.variable(inputs))
+    assert K.dtype(outputs) == K.floatx()
+    assert_allclose(K.eval(outputs), K.eval(layer(K.variable(inputs))),
+                    rtol=1e-2, atol=1e-2)
+
+    with pytest.raises(ValueError):
+        layer_class(compute_dtype='int8', **kwargs)
+
+
+@pytest.mark.parametrize('data_format',
+                         ['channels_first', 'channels_last'])
+def test_convolution_2d_fuse_siblings(data_format):
+    num_samples = 2
+    stack_size = 3
+    num_row = 7
+    num_col = 6
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, num_row, num_col)
+    else:
+        input_shape = (num_samples, num_row, num_col, stack_size)
+    kwargs = {'kernel_size': (3, 3),
+              'padding': 'same',
+              'data_format': data_format}
+
+    layers = [convolutional.Conv2D(2, activation='relu', **kwargs),
+              convolutional.Conv2D(3, **kwargs),
+              convolutional.Conv2D(1, use_bias=False, **kwargs)]
+    for layer in layers:
+        layer.build(input_shape)
+        layer.set_weights([np.random.random(w.shape)
+                           for w in layer.get_weights()])
+    inputs = K.variable(np.random.random(input_shape))
+    expected = [K.eval(layer(inputs)) for layer in layers]
+    fused = convolutional.Conv2D.fuse_siblings(layers, inputs)
+    for output, expected_output in zip(fused, expected):
+        assert_allclose(K.eval(output), expected_output, atol=1e-5)
+
+    other = convolutional.Conv2D(2, kernel_size=(3, 3), padding='valid',
+                                 data_format=data_format)
+    other.build(input_shape)
+    with pytest.raises(ValueError):
+        convolutional.Conv2D.fuse_siblings(layers + [other], inputs)
+
+
 @pytest.mark.parametrize(
     'padding,out_padding,strides',
     [(padding, out_padding, strides)
@@ -243,6 +456,67 @@ def test_conv2d_transpose_dilation():
                expected_output=expected_output)
 
 
+@pytest.mark.parametrize(
+    'padding,kernel_size,data_format,lowering',
+    [(padding, kernel_size, data_format, lowering)
+     for padding in ['valid', 'same']
+     for kernel_size in [2, 3]
+     for data_format in ['channels_first', 'channels_last']
+     for lowering in [None, 'winograd']
+     if not (K.backend() == 'theano' and
+             padding == 'same' and kernel_size % 2 == 0)]
+)
+def test_conv2d_transpose_stride_one(padding, kernel_size, data_format,
+                                     lowering):
+    if data_format == 'channels_first':
+        input_shape = (2, 3, 5, 6)
+    else:
+        input_shape = (2, 5, 6, 3)
+    layer = convolutional.Conv2DTranspose(filters=2,
+                                          kernel_size=kernel_size,
+                                          padding=padding,
+                                          data_format=data_format,
+                                          use_bias=False,
+                                          lowering=lowering)
+    layer.build(input_shape)
+    inputs = K.variable(np.random.random(input_shape))
+    output_shape = (2,) + layer.compute_output_shape(input_shape)[1:]
+    expected = K.eval(K.conv2d_transpose(inputs, layer.kernel, output_shape,
+                                         strides=(1, 1),
+                                         padding=padding,
+                                         data_format=data_format))
+    assert_allclose(K.eval(layer(inputs)), expected, atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    'padding,kernel_size,out_padding',
+    [(padding, kernel_size, out_padding)
+     for padding in _convolution_paddings
+     for kernel_size in [2, 3]
+     for out_padding in [None, (0, 0)]
+     if not (K.backend() == 'theano' and
+             padding == 'same' and kernel_size % 2 == 0)]
+)
+def test_conv2d_transpose_stride_one_output_padding(padding, kernel_size,
+                                                    out_padding):
+    input_shape = (2, 5, 6, 3)
+    layer = convolutional.Conv2DTranspose(filters=2,
+                                          kernel_size=kernel_size,
+                                          padding=padding,
+                                          output_padding=out_padding,
+                                          use_bias=False)
+    layer.build(input_shape)
+    inputs = K.variable(np.random.random(input_shape))
+    output_shape = (2,) + layer.compute_output_shape(input_shape)[1:]
+    expected = K.eval(K.conv2d_transpose(inputs, layer.kernel, output_shape,
+                                         strides=(1, 1),
+                                         padding=padding,
+                                         data_format='channels_last'))
+    outputs = K.eval(layer(inputs))
+    assert outputs.shape == output_shape
+    assert_allclose(outputs, expected, atol=1e-5)
+
+
 def test_conv2d_transpose_channels_first():
     num_samples = 2
     filters = 2
@@ -396,6 +670,94 @@ def test_separable_conv_2d(padding, strides, multiplier, dilation_rate):
         input_shape=(num_samples, num_row, num_col, stack_size))
 
 
+@pytest.mark.parametrize('padding,strides,data_format,num_row,num_col', [
+    ('valid', (1, 1), 'channels_last', 75, 6),
+    ('valid', (2, 2), 'channels_last', 75, 6),
+    ('same', (1, 1), 'channels_last', 75, 6),
+    ('same', (2, 2), 'channels_last', 75, 6),
+    ('same', (1, 1), 'channels_first', 75, 6),
+    ('same', (1, 1), 'channels_last', 10, 40000),
+])
+def test_separable_conv_2d_tiled(padding, strides, data_format,
+                                 num_row, num_col):
+    num_samples = 2
+    stack_size = 3
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, num_row, num_col)
+    else:
+        input_shape = (num_samples, num_row, num_col, stack_size)
+    layer = convolutional.SeparableConv2D(filters=4,
+                                          kernel_size=(3, 3),
+                                          padding=padding,
+                                          strides=strides,
+                                          data_format=data_format,
+                                          depth_multiplier=2,
+                                          activation='relu',
+                                          bias_initializer='ones',
+                                          row_tiling=True)
+    x = K.variable(np.random.random(input_shape))
+    layer.build(input_shape)
+    if data_format == 'channels_last':
+        assert layer._supports_tiling(x, data_format)
+    expected = K.separable_conv2d(x, layer.depthwise_kernel,
+                                  layer.pointwise_kernel,
+                                  strides=strides,
+                                  padding=padding,
+                                  data_format=data_format)
+    expected = K.relu(K.bias_add(expected, layer.bias,
+                                 data_format=data_format))
+    assert_allclose(K.eval(layer(x)), K.eval(expected), rtol=1e-5, atol=1e-5)
+
+
+def test_separable_conv_row_tiling_is_opt_in():
+    input_shape = (2, 75, 6, 3)
+    layer = convolutional.SeparableConv2D(filters=4, kernel_size=(3, 3))
+    x = K.variable(np.random.random(input_shape))
+    layer.build(input_shape)
+    assert not layer._supports_tiling(x, 'channels_last')
+    with pytest.raises(ValueError):
+        convolutional.SeparableConv1D(filters=4, kernel_size=3,
+                                      row_tiling=True)
+
+
+@pytest.mark.parametrize('data_format',
+                         ['channels_first', 'channels_last'])
+def test_separable_conv_2d_fuse_siblings(data_format):
+    num_samples = 2
+    stack_size = 3
+    num_row = 7
+    num_col = 6
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, num_row, num_col)
+    else:
+        input_shape = (num_samples, num_row, num_col, stack_size)
+    kwargs = {'filters': 4,
+              'kernel_size': (3, 3),
+              'padding': 'same',
+              'depth_multiplier': 2,
+              'data_format': data_format}
+
+    layers = [convolutional.SeparableConv2D(activation='relu', **kwargs),
+              convolutional.SeparableConv2D(**kwargs),
+              convolutional.SeparableConv2D(use_bias=False, **kwargs)]
+    for layer in layers:
+        layer.build(input_shape)
+        layer.set_weights([np.random.random(w.shape)
+                           for w in layer.get_weights()])
+    inputs = K.variable(np.random.random(input_shape))
+    expected = [K.eval(layer(inputs)) for layer in layers]
+    fused = convolutional.SeparableConv2D.fuse_siblings(layers, inputs)
+    for output, expected_output in zip(fused, expected):
+        assert_allclose(K.eval(output), expected_output, atol=1e-4)
+
+    other = convolutional.SeparableConv2D(filters=2, kernel_size=(3, 3),
+                                          padding='same',
+                                          data_format=data_format)
+    other.build(input_shape)
+    with pytest.raises(ValueError):
+        convolutional.SeparableConv2D.fuse_siblings(layers + [other], inputs)
+
+
 def test_separable_conv_2d_additional_args():
     num_samples = 2
     filters = 6
@@ -462,6 +824,47 @@ def test_depthwise_conv_2d(padding, strides, multiplier, dilation_rate):
                             stack_size))
 
 
+@pytest.mark.parametrize('padding,strides,data_format,multiplier', [
+    ('valid', (1, 1), 'channels_last', 1),
+    ('valid', (2, 2), 'channels_last', 1),
+    ('same', (1, 1), 'channels_last', 1),
+    ('same', (2, 2), 'channels_first', 1),
+    ('valid', (1, 1), 'channels_last', 2),
+    ('same', (2, 2), 'channels_first', 3),
+])
+def test_depthwise_conv_2d_direct(padding, strides, data_format, multiplier):
+    num_samples = 2
+    stack_size = 3
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, 7, 6)
+    else:
+        input_shape = (num_samples, 7, 6, stack_size)
+    layer = convolutional.DepthwiseConv2D(kernel_size=(3, 3),
+                                          padding=padding,
+                                          strides=strides,
+                                          depth_multiplier=multiplier,
+                                          data_format=data_format,
+                                          lowering='direct')
+    x = K.variable(np.random.random(input_shape))
+    layer.build(input_shape)
+    assert layer._supports_direct(x, data_format)
+    expected = K.depthwise_conv2d(x, layer.depthwise_kernel,
+                                  strides=strides,
+                                  padding=padding,
+                                  data_format=data_format)
+    assert_allclose(K.eval(layer(x)), K.eval(expected), rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize('multiplier', [1, 3])
+def test_depthwise_conv_2d_direct_is_opt_in(multiplier):
+    input_shape = (2, 7, 6, 3)
+    layer = convolutional.DepthwiseConv2D(kernel_size=(3, 3),
+                                          depth_multiplier=multiplier)
+    x = K.variable(np.random.random(input_shape))
+    layer.build(input_shape)
+    assert not layer._supports_direct(x, 'channels_last')
+
+
 def test_depthwise_conv_2d_additional_args():
     num_samples = 2
     stack_size = 3
@@ -655,6 +1058,9 @@ def test_zero_padding_1d():
     layer_test(convolutional.ZeroPadding1D,
                kwargs={'padding': (1, 2)},
                input_shape=inputs.shape)
+    layer_test(convolutional.ZeroPadding1D,
+               kwargs={'padding': 0},
+               input_shape=inputs.shape)
 
     # correctness test
     layer = convolutional.ZeroPadding1D(padding=2)
@@ -917,6 +1323,24 @@ def test_upsampling_2d_bilinear(data_format):
                 assert np_output.shape[2] == length_col * input_num_col
 
 
+@pytest.mark.skipif(K.backend() != 'tensorflow',
+                    reason='Matches the TensorFlow interpolation.')
+@pytest.mark.parametrize('data_format',
+                         ['channels_first', 'channels_last'])
+def test_upsampling_2d_bilinear_values(data_format):
+    if data_format == 'channels_first':
+        inputs = np.random.rand(2, 3, 5, 6)
+    else:
+        inputs = np.random.rand(2, 5, 6, 3)
+    layer = convolutional.UpSampling2D(size=(2, 3),
+                                       data_format=data_format,
+                                       interpolation='bilinear')
+    outputs = layer(K.variable(inputs))
+    expected = K.resize_images(K.variable(inputs), 2, 3, data_format,
+                               interpolation='bilinear')
+    assert_allclose(K.eval(outputs), K.eval(expected), atol=1e-5)
+
+
 @pytest.mark.skipif((K.backend() == 'cntk'),
                     reason="cntk does not support it yet")
 @pytest.mark.parametrize('data_format',
@@ -984,6 +1408,9 @@ def test_cropping_1d():
     layer_test(convolutional.Cropping1D,
                kwargs={'cropping': (2, 2)},
                input_shape=inputs.shape)
+    layer_test(convolutional.Cropping1D,
+               kwargs={'cropping': 0},
+               input_shape=inputs.shape)
 
 
 def test_cropping_2d():
@@ -1117,6 +1544,38 @@ def test_cropping_3d():
         layer = convolutional.Cropping3D(cropping=lambda x: x)
 
 
+@pytest.mark.parametrize('data_format',
+                         ['channels_first', 'channels_last'])
+def test_class_activation_mapping(data_format):
+    num_samples = 2
+    stack_size = 3
+    num_classes = 4
+    num_row = 5
+    num_col = 6
+    if data_format == 'channels_first':
+        input_shape = (num_samples, stack_size, num_row, num_col)
+    else:
+        input_shape = (num_samples, num_row, num_col, stack_size)
+    weights = np.random.random((stack_size, num_classes))
+
+    layer_test(convolutional.ClassActivationMapping,
+               kwargs={'weights_shape': (stack_size, num_classes),
+                       'data_format': data_format},
+               input_shape=input_shape)
+
+    inputs = np.random.random(input_shape)
+    layer = convolutional.ClassActivationMapping(
+        weights_shape=(stack_size, num_classes), weights=weights,
+        data_format=data_format)
+    layer.build(input_shape)
+    np_output = K.eval(layer(K.variable(inputs)))
+    if data_format == 'channels_first':
+        expected = np.einsum('nchw,ck->nkhw', inputs, weights)
+    else:
+        expected = np.einsum('nhwc,ck->nhwk', inputs, weights)
+    assert_allclose(np_output, expected, rtol=1e-5)
+
+
 @pytest.mark.skipif((K.backend() == 'cntk'),
                     reason='CNTK does not support float64')
 @pytest.mark.parametrize(
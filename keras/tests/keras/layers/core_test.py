@@ -17,6 +17,40 @@ def test_masking():
                kwargs={},
                input_shape=(3, 2, 3))
 
+    for mask_value in [0., 1.]:
+        x = np.random.random((3, 2, 3))
+        x[0, 1] = mask_value
+        x[2, 0] = mask_value
+        expected = x * np.any(x != mask_value, axis=-1, keepdims=True)
+        x = K.variable(x)
+        y = layers.Masking(mask_value=mask_value)(x)
+        assert_allclose(K.eval(y), expected, atol=1e-6)
+
+        # Masked timesteps pass no gradient to the layers before.
+        grad = K.eval(K.gradients(K.sum(y), [x])[0])
+        assert_allclose(grad[0, 1], 0.)
+        assert_allclose(grad[2, 0], 0.)
+        assert_allclose(grad[1], 1.)
+
+
+def test_guided_dropout():
+    num_samples = 4
+    num_matrices = 3
+    num_features = 5
+    weights = np.random.random((num_matrices, num_features))
+    modulated = np.random.random((num_samples, num_features))
+    modulator = np.random.random((num_samples, num_matrices))
+
+    layer = layers.GuidedDropout((num_matrices, num_features),
+                                 weights=weights)
+    outputs = layer([K.variable(modulated), K.variable(modulator)])
+
+    # Each sample is scaled by the row of its argmax, selected as a
+    # one-hot matrix product.
+    one_hot = np.eye(num_matrices)[np.argmax(modulator, axis=1)]
+    expected = modulated * np.dot(one_hot, weights)
+    assert_allclose(K.eval(outputs), expected, atol=1e-6)
+
 
 def test_dropout():
     layer_test(layers.Dropout,